@@ -0,0 +1,371 @@
+"""
+标注结果持久化模块
+
+标注数据保存在本地 SQLite 数据库中：文档登记时一次性写入全部句子和分词结果，
+之后每次修改标签只更新对应的一行（按 (doc_id, sentence_id, token_idx) 主键定位），
+不需要重建整个标注表。重新打开同一文档时直接从数据库读取句子、分词和已有标签，
+不再重新分句分词，可以立即继续之前的标注。
+
+标注项目按标注者区分：doc_id 由标注者和文本内容的哈希得到，同一标注者在不同会话中
+打开同一文本时对应同一个标注项目，不同标注者之间互不可见。
+documents.labeled 随标签修改增量维护，列出项目时不需要统计 tokens 表。
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+ANNOTATION_DB_PATH = os.environ.get('ANNOTATION_DB_PATH', './data/annotations.db')
+
+# 未标注的词语在数据库中 label 为 NULL，界面和导出中显示为该值
+UNLABELED = '无标注'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    sentence_count INTEGER NOT NULL,
+    token_count INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner TEXT,
+    labeled INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS sentences (
+    doc_id TEXT NOT NULL,
+    sentence_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    category TEXT,
+    PRIMARY KEY (doc_id, sentence_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tokens (
+    doc_id TEXT NOT NULL,
+    sentence_id INTEGER NOT NULL,
+    token_idx INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    label TEXT,
+    PRIMARY KEY (doc_id, sentence_id, token_idx)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tokens_labeled ON tokens (doc_id, label) WHERE label IS NOT NULL;
+"""
+
+# 旧版本数据库的 documents 表缺少的列：列名 -> 定义
+_MIGRATIONS = {
+    'owner': 'owner TEXT',
+    'labeled': 'labeled INTEGER NOT NULL DEFAULT 0',
+}
+
+
+def document_id(owner, text):
+    """
+    标注项目的 ID
+
+    Args:
+        owner: 标注者标识
+        text: 文档原文
+
+    Returns:
+        十六进制字符串
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(owner.encode('utf-8') + b'\0')
+    digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class AnnotationStore:
+    """
+    SQLite 标注库
+
+    Streamlit 在不同线程中运行页面脚本，这里使用一个跨线程共享的连接，
+    所有操作通过锁串行执行。数据库使用 WAL 模式，单行更新开销很小。
+
+    Args:
+        path: 数据库文件路径，':memory:' 表示内存数据库
+    """
+
+    def __init__(self, path=ANNOTATION_DB_PATH):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        # isolation_level=None：自动提交，每次修改立即写入
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(_SCHEMA)
+            self._migrate()
+            self._conn.execute('CREATE INDEX IF NOT EXISTS documents_owner ON documents (owner, updated_at)')
+
+    def _migrate(self):
+        # 为旧版本数据库补充新增的列
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(documents)')}
+        missing = [name for name in _MIGRATIONS if name not in columns]
+        for name in missing:
+            self._conn.execute(f'ALTER TABLE documents ADD COLUMN {_MIGRATIONS[name]}')
+        if 'labeled' in missing:
+            # 一次性补齐已有文档的已标注词数
+            self._conn.execute(
+                'UPDATE documents SET labeled = '
+                '(SELECT COUNT(label) FROM tokens t WHERE t.doc_id = documents.doc_id)'
+            )
+
+    def load_document(self, doc_id):
+        """
+        读取已登记文档的句子和分词结果
+
+        Returns:
+            {'sentences': [句子, ...], 'tokens': [[(词序号, 词语), ...], ...]}，
+            文档不存在时返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT sentence_count FROM documents WHERE doc_id = ?', (doc_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            sentences = [text for (text,) in self._conn.execute(
+                'SELECT text FROM sentences WHERE doc_id = ? ORDER BY sentence_id', (doc_id,)
+            )]
+            tokens = [[] for _ in range(row[0])]
+            for sentence_id, token_idx, word in self._conn.execute(
+                'SELECT sentence_id, token_idx, word FROM tokens WHERE doc_id = ? '
+                'ORDER BY sentence_id, token_idx', (doc_id,)
+            ):
+                tokens[sentence_id].append((token_idx, word))
+        return {'sentences': sentences, 'tokens': tokens}
+
+    def document_text(self, doc_id):
+        """已登记文档的原文，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute('SELECT text FROM documents WHERE doc_id = ?', (doc_id,)).fetchone()
+        return row[0] if row else None
+
+    def save_document(self, doc_id, text, sentences, tokens, owner=None):
+        """
+        登记文档，一次性写入全部句子和分词结果（已登记的文档不会被覆盖）
+
+        Args:
+            doc_id: 文档 ID（见 document_id）
+            text: 文档原文
+            sentences: [句子, ...]
+            tokens: [[(词序号, 词语), ...], ...]，与 sentences 一一对应
+            owner: 标注者标识
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                cursor = self._conn.execute(
+                    'INSERT OR IGNORE INTO documents '
+                    '(doc_id, text, sentence_count, token_count, created_at, updated_at, owner, labeled) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, 0)',
+                    (doc_id, text, len(sentences), sum(len(t) for t in tokens), now, now, owner)
+                )
+                if cursor.rowcount:
+                    self._conn.executemany(
+                        'INSERT INTO sentences (doc_id, sentence_id, text) VALUES (?, ?, ?)',
+                        ((doc_id, i, sentence) for i, sentence in enumerate(sentences))
+                    )
+                    self._conn.executemany(
+                        'INSERT INTO tokens (doc_id, sentence_id, token_idx, word) VALUES (?, ?, ?, ?)',
+                        ((doc_id, i, j, word) for i, words in enumerate(tokens) for j, word in words)
+                    )
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def set_token_label(self, doc_id, sentence_id, token_idx, label):
+        """更新一个词语的标签，label 为 None 或 UNLABELED 时清除标签"""
+        if label == UNLABELED:
+            label = None
+        key = (doc_id, sentence_id, token_idx)
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                row = self._conn.execute(
+                    'SELECT label FROM tokens WHERE doc_id = ? AND sentence_id = ? AND token_idx = ?', key
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        'UPDATE tokens SET label = ? WHERE doc_id = ? AND sentence_id = ? AND token_idx = ?',
+                        (label, *key)
+                    )
+                    self._touch(doc_id, (label is not None) - (row[0] is not None))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def fill_token_labels(self, doc_id, labels):
+        """
+        批量写入标签（例如预标注结果），只填充尚未标注的词语，不覆盖已有标签
+
+        Args:
+            doc_id: 文档 ID
+            labels: {(句子序号, 词序号): 标签}
+
+        Returns:
+            实际写入的词语数
+        """
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    'UPDATE tokens SET label = ? WHERE doc_id = ? AND sentence_id = ? AND token_idx = ? '
+                    'AND label IS NULL',
+                    ((label, doc_id, i, j) for (i, j), label in labels.items() if label is not None)
+                )
+                filled = self._conn.total_changes - before
+                self._touch(doc_id, filled)
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            return filled
+
+    def set_sentence_category(self, doc_id, sentence_id, category):
+        """更新一个句子的类别"""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE sentences SET category = ? WHERE doc_id = ? AND sentence_id = ?',
+                (category, doc_id, sentence_id)
+            )
+            self._touch(doc_id)
+
+    def _touch(self, doc_id, labeled_delta=0):
+        # 更新修改时间，并按已标注词数的变化调整 labeled
+        self._conn.execute(
+            'UPDATE documents SET updated_at = ?, labeled = labeled + ? WHERE doc_id = ?',
+            (time.time(), labeled_delta, doc_id)
+        )
+
+    def token_labels(self, doc_id):
+        """
+        已标注的词语
+
+        Returns:
+            {句子序号: {词序号: 标签}}
+        """
+        labels = {}
+        with self._lock:
+            for sentence_id, token_idx, label in self._conn.execute(
+                'SELECT sentence_id, token_idx, label FROM tokens '
+                'WHERE doc_id = ? AND label IS NOT NULL', (doc_id,)
+            ):
+                labels.setdefault(sentence_id, {})[token_idx] = label
+        return labels
+
+    def sentence_categories(self, doc_id):
+        """
+        已分类的句子
+
+        Returns:
+            {句子序号: 类别}
+        """
+        with self._lock:
+            return dict(self._conn.execute(
+                'SELECT sentence_id, category FROM sentences '
+                'WHERE doc_id = ? AND category IS NOT NULL', (doc_id,)
+            ))
+
+    def label_stats(self, doc_id):
+        """
+        Returns:
+            (总词数, 已标注词数)
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT token_count, labeled FROM documents WHERE doc_id = ?', (doc_id,)
+            ).fetchone()
+        return tuple(row) if row else (0, 0)
+
+    def export_tokens(self, doc_id, labeled_only=False):
+        """
+        导出词语标注结果
+
+        Returns:
+            DataFrame，列为 sentence_id（从 1 开始）、sentence、word、label
+        """
+        query = (
+            'SELECT t.sentence_id + 1 AS sentence_id, s.text AS sentence, t.word, '
+            'COALESCE(t.label, ?) AS label '
+            'FROM tokens t JOIN sentences s '
+            'ON s.doc_id = t.doc_id AND s.sentence_id = t.sentence_id '
+            'WHERE t.doc_id = ?'
+        )
+        if labeled_only:
+            query += ' AND t.label IS NOT NULL'
+        query += ' ORDER BY t.sentence_id, t.token_idx'
+        with self._lock:
+            return pd.read_sql_query(query, self._conn, params=(UNLABELED, doc_id))
+
+    def list_documents(self, owner):
+        """
+        标注者已保存的标注项目，最近修改的在前
+
+        Args:
+            owner: 标注者标识
+
+        Returns:
+            DataFrame，列为 doc_id、preview（原文开头）、sentence_count、token_count、labeled、updated_at
+        """
+        with self._lock:
+            return pd.read_sql_query(
+                'SELECT doc_id, substr(text, 1, 40) AS preview, sentence_count, token_count, labeled, '
+                "datetime(updated_at, 'unixepoch', 'localtime') AS updated_at "
+                'FROM documents WHERE owner = ? ORDER BY updated_at DESC',
+                self._conn, params=(owner,)
+            )
+
+    def delete_if_unannotated(self, doc_id):
+        """
+        删除没有任何标注的文档（例如只是切换了预处理选项而产生的文档）
+
+        Returns:
+            是否删除了文档
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT labeled = 0 AND NOT EXISTS '
+                '(SELECT 1 FROM sentences s WHERE s.doc_id = d.doc_id AND s.category IS NOT NULL) '
+                'FROM documents d WHERE doc_id = ?', (doc_id,)
+            ).fetchone()
+        if not row or not row[0]:
+            return False
+        self.delete_document(doc_id)
+        return True
+
+    def delete_document(self, doc_id):
+        """删除文档及其全部标注"""
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                for table in ('tokens', 'sentences', 'documents'):
+                    self._conn.execute(f'DELETE FROM {table} WHERE doc_id = ?', (doc_id,))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_store():
+    """进程内共享的标注库（首次调用时打开 ANNOTATION_DB_PATH）"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AnnotationStore()
+        return _store
@@ -1,20 +1,15 @@
+import time
 import streamlit as st
 import pandas as pd
-import numpy as np
-import re
-from collections import Counter
-import jieba
-import io
-import requests
-from snownlp import SnowNLP
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import base64
-import tempfile
-import copy
-from PIL import Image
-
-from common import generate_wordcloud, count_word_frequency, count_characters, split_words, text_annotation
+import html
+import caching
+import warmup
+from textio import iter_uploaded_text, read_uploaded_text
+
+# 各页面用到的分析模块在对应页面中才导入；
+# jieba 词典、SnowNLP 模型、字体等在后台线程中预热（每个进程一次）
+_run_start = time.perf_counter()
+warmup.start()
 
 
 example_text="人工智能（Artificial Intelligence, AI）是计算机科学的一个分支，旨在创建能够像人类一样思考和学习的智能机器。AI技术包括机器学习（Machine Learning）、自然语言处理（Natural Language Processing）和计算机视觉（Computer Vision）等。随着科技的进步，AI在各个领域的应用越来越广泛，例如自动驾驶（Autonomous Driving）、医疗诊断（Medical Diagnosis）和智能客服（Intelligent Customer Service）等。AI的快速发展不仅改变了我们的生活方式，也引发了关于伦理和隐私的广泛讨论。未来，AI有望在教育、金融、制造业等更多领域发挥重要作用，推动社会的进一步发展。AI的潜力是无限的，它不仅可以提高生产效率，还可以通过分析大量数据来提供更好的决策支持。随着AI算法的不断优化和计算能力的提升，我们可以期待AI在解决复杂问题和创新方面带来更多突破。"
@@ -98,6 +93,77 @@ page = st.sidebar.radio(
     pages
 )
 
+# 缓存命中情况（各模块的缓存在页面重新运行之间保留）
+with st.sidebar.expander('⚡ 缓存状态'):
+    cache_rows = caching.registered_stats()
+    if cache_rows:
+        cache_df = pd.DataFrame(cache_rows).set_index('cache')
+        cache_df['hit_rate'] = (cache_df['hit_rate'] * 100).round(1)
+        st.dataframe(cache_df.rename(columns={
+            'hits': '命中', 'misses': '未命中', 'entries': '条目数', 'hit_rate': '命中率(%)'
+        }))
+    if st.button('清空全部缓存', key='clear_all_caches'):
+        caching.clear_all()
+        st.rerun()
+
+# 用户词典（网络用语、人名、领域术语等）
+with st.sidebar.expander('📖 用户词典'):
+    import userdict
+    dictionaries = userdict.list_dictionaries()
+    for item in dictionaries:
+        name_col, delete_col = st.columns([3, 1])
+        name_col.write(f"{item['name']}（{item['words']} 词）")
+        if delete_col.button('删除', key=f"delete_userdict_{item['name']}"):
+            userdict.delete_dictionary(item['name'])
+            userdict.apply()
+            st.rerun()
+    if not dictionaries:
+        st.caption('尚未添加用户词典')
+    uploaded_dicts = st.file_uploader(
+        '上传词典（每行：词语 [词频] [词性]）', type=['txt'], accept_multiple_files=True, key='userdict_upload'
+    )
+    if uploaded_dicts and st.button('保存并应用', key='save_userdict'):
+        for uploaded_dict in uploaded_dicts:
+            userdict.save_dictionary(uploaded_dict.name, uploaded_dict.getvalue())
+        userdict.apply()
+        st.rerun()
+    new_words = st.text_input('添加词语（用空格分隔）', key='userdict_new_words')
+    if new_words and st.button('添加', key='add_userdict_words'):
+        added = userdict.add_words(new_words.split())
+        userdict.apply()
+        st.success(f'已添加 {added} 个词语')
+
+# 用户停用词表
+with st.sidebar.expander('🚫 停用词表'):
+    import stopwords
+    user_lists = [name for name in stopwords.list_paths() if name.startswith(stopwords.USER_PREFIX)]
+    for name in user_lists:
+        name_col, delete_col = st.columns([3, 1])
+        name_col.write(f"{stopwords.label(name)}（{len(stopwords.load_list(name))} 词）")
+        if delete_col.button('删除', key=f'delete_stopwords_{name}'):
+            stopwords.delete_user_list(name)
+            st.rerun()
+    if not user_lists:
+        st.caption('尚未上传停用词表')
+    uploaded_stopwords = st.file_uploader(
+        '上传停用词表（每行一个词语）', type=['txt'], accept_multiple_files=True, key='stopwords_upload'
+    )
+    if uploaded_stopwords and st.button('保存', key='save_stopwords'):
+        for uploaded_list in uploaded_stopwords:
+            stopwords.save_user_list(uploaded_list.name, uploaded_list.getvalue())
+        st.rerun()
+
+# 启动预热和页面运行耗时
+with st.sidebar.expander('⏱ 启动耗时'):
+    warmup_status = warmup.status()
+    st.write('预热完成' if warmup_status['done'] else '正在后台预热...')
+    for step, value in warmup_status['steps'].items():
+        st.write(f'- {step}: ' + (f'{value:.2f} 秒' if isinstance(value, float) else value))
+    runs = warmup_status['runs']
+    if runs['first'] is not None:
+        st.write(f"首次运行: {runs['first']:.2f} 秒")
+        st.write(f"上次运行: {runs['last']:.2f} 秒（共 {runs['count']} 次）")
+
 # 添加页脚
 st.sidebar.markdown('---')
 st.sidebar.markdown('### 关于')
@@ -289,7 +355,7 @@ if page == '首页':
     # 使用列布局来控制图片宽度
     col1, col2, col3 = st.columns([0.05, 0.9, 0.05])  # 使用90%的宽度
     with col2:
-        st.image('static/LPT.png', use_container_width=True)
+        st.image('static/LPT.png', width='stretch')
     
     # 页脚信息
     st.markdown("""
@@ -302,69 +368,56 @@ if page == '首页':
 
 # B站弹幕分析部分
 elif page == 'B站弹幕分析':
+    import bilibili
+    import danmaku_store
+    import exports
+    import sentiment
+    import timeline
+    from common import count_word_frequency, generate_wordcloud
+
     st.title('B站弹幕分析 🎬')
     
     # 添加刷新按钮
     refresh_button = st.button('刷新', type='primary')
     if refresh_button:
         st.session_state['video_url'] = ""
+        bilibili.clear_cache()
     
     # 输入B站视频URL
-    video_url = st.text_input('请输入B站视频URL:', key='video_url')
+    video_url = st.text_input('请输入B站视频URL（多个URL用空格或逗号分隔）:', key='video_url')
+    fetch_all_parts = st.checkbox('获取多P视频的全部分P', key='fetch_all_parts')
+    danmaku_source = st.radio(
+        '弹幕来源',
+        ['实时弹幕（速度快，条数有上限）', '全部弹幕（分段获取）'],
+        horizontal=True,
+        key='danmaku_source'
+    )
     if video_url:
         try:
-            # 获取视频信息
-            headers = {
-                'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'referer': 'https://www.bilibili.com'
-            }
-            
-            response = requests.get(video_url, headers=headers)
-            response.raise_for_status()
-            
-            # 获取cid
-            cid_match = re.search(r'"cid":(\d+)', response.text)
-            if not cid_match:
-                st.error("无法在页面中找到cid")
-            else:
-                cid = cid_match.group(1)
-                
-                # 获取弹幕数据
-                danmaku_url = f'https://api.bilibili.com/x/v1/dm/list.so?oid={cid}'
-                response = requests.get(danmaku_url, headers=headers)
-                content = response.content.decode('utf-8')
+            # 获取视频信息，解析出每个分P的cid
+            targets, failed = bilibili.resolve_targets(bilibili.split_urls(video_url), fetch_all_parts)
+            for url, reason in failed:
+                st.error(f"获取视频信息失败: {url}（{reason}）")
+            if targets:
+                # 并发获取弹幕数据（边下载边解析）并合并
+                danmaku_df = bilibili.fetch_batch(targets, segmented=danmaku_source.startswith('全部'))
                 
-                pattern = r'<d p="([0-9.]+),.*?">(.*?)</d>'
-                matches = re.findall(pattern, content)
-                
-                if not matches:
+                if danmaku_df.empty:
                     st.warning("未找到弹幕")
                 else:
-                    danmaku_list = []
-                    for time_str, text in matches:
-                        seconds = float(time_str)
-                        minutes = int(seconds // 60)
-                        remaining_seconds = int(seconds % 60)
-                        formatted_time = f"{minutes:02d}:{remaining_seconds:02d}"
-                        
-                        danmaku_list.append({
-                            'time': formatted_time,
-                            'time_seconds': seconds,
-                            'text': text.strip()
-                        })
-                    # 按时间排序
-                    danmaku_list.sort(key=lambda x: x['time_seconds'])
-                    
                     # 显示弹幕数据
-                    st.write(f"共获取到 {len(danmaku_list)} 条弹幕")
+                    st.write(f"共获取到 {len(danmaku_df)} 条弹幕")
+                    if len(targets) > 1:
+                        st.write(f"来自 {len(targets)} 个分P：")
+                        st.dataframe(danmaku_df.groupby(['source', 'part'], observed=True).size().to_frame('弹幕数'))
                     
                     # 显示弹幕选项
                     show_danmaku = st.checkbox('显示弹幕内容')
                     if show_danmaku:
                         display_count = st.number_input('显示弹幕数量', 
                                                       min_value=1, 
-                                                      max_value=len(danmaku_list),
-                                                      value=min(10, len(danmaku_list)))
+                                                      max_value=len(danmaku_df),
+                                                      value=min(10, len(danmaku_df)))
                         
                         # 显示指定数量的弹幕
                         st.write('弹幕内容:')
@@ -372,8 +425,9 @@ elif page == 'B站弹幕分析':
                             container = st.container()
                             scroll_height = min(400, display_count * 50)  # 根据显示数量动态调整高度
                             with container:
-                                for item in danmaku_list[:display_count]:
-                                    st.markdown(f"<div style='margin-bottom:10px'>{item['time']}: {item['text']}</div>", 
+                                shown = danmaku_df.head(display_count)
+                                for time_str, text in zip(danmaku_store.format_time(shown['time_seconds']), shown['text']):
+                                    st.markdown(f"<div style='margin-bottom:10px'>{time_str}: {html.escape(text)}</div>", 
                                               unsafe_allow_html=True)
                             # 设置容器的最大高度和滚动
                             st.markdown(f"""
@@ -393,89 +447,111 @@ elif page == 'B站弹幕分析':
                     if '词频统计' in analysis_type:
                         st.subheader('📊 词频统计分析')
                         with st.spinner('正在进行词频统计...'):
-                            texts = [item['text'] for item in danmaku_list]
+                            texts = danmaku_df['text'].tolist()
                             count_word_frequency(' '.join(texts))
                             
                     if '情感分析' in analysis_type:
                         st.subheader('😊 情感分析')
                         st.info('注意: 当前情感分析模型仍有待提升,分析结果仅供参考。')
+                        backends = sentiment.available_backends()
+                        sentiment_backend = st.selectbox(
+                            '情感分析方式',
+                            list(backends),
+                            format_func=backends.get,
+                            help='弹幕数量很多时可选择词典方式，速度快得多，但对语义的把握较粗'
+                        )
                         with st.spinner('正在进行情感分析...'):
-                            texts = [item['text'] for item in danmaku_list]
-                            sentiments = []
-                            danmaku_sentiments = []  # 存储弹幕和对应的情感值
-                            for text in texts:
-                                try:
-                                    sentiment = SnowNLP(text).sentiments
-                                    sentiments.append(sentiment)
-                                    danmaku_sentiments.append({'text': text, 'sentiment': sentiment})
-                                except:
-                                    continue
-                            
-                            # 对弹幕按情感分类
-                            positive = [d['text'] for d in danmaku_sentiments if d['sentiment'] > 0.6]
-                            neutral = [d['text'] for d in danmaku_sentiments if 0.4 <= d['sentiment'] <= 0.6]
-                            negative = [d['text'] for d in danmaku_sentiments if d['sentiment'] < 0.4]
-                            
-                            sentiment_dist = {
-                                '积极': len(positive),
-                                '中性': len(neutral),
-                                '消极': len(negative)
-                            }
+                            texts = danmaku_df['text'].tolist()
+                            times = danmaku_df['time_seconds'].to_numpy()
+                            # 批量计算：去重、缓存，弹幕较多时多进程并行
+                            scores = sentiment.score_texts(texts, backend=sentiment_backend)
+                            # 结果按列存储，分类与统计均为向量化计算
+                            sentiment_result = sentiment.sentiment_frame(texts, scores, times)
                             
                             st.write('情感分析结果:')
-                            sentiment_df = pd.DataFrame([sentiment_dist]).T
-                            sentiment_df.columns = ['数量']
+                            sentiment_df = sentiment.category_counts(sentiment_result).to_frame('数量')
                             st.dataframe(sentiment_df)
 
+                            # 情感随视频时间的变化
+                            show_curve = st.checkbox('显示情感随时间变化曲线')
+                            if show_curve and not sentiment_result.empty:
+                                bin_seconds = st.number_input('时间分段（秒）', min_value=1, value=30)
+                                curve = sentiment.sentiment_curve(sentiment_result, bin_seconds)
+                                st.line_chart(curve['平均情感值'])
+
                             # 添加显示各类情感幕的选项
                             show_examples = st.checkbox('显示情感分类弹幕示例')
                             if show_examples:
                                 display_count = st.number_input('每类显示条数', min_value=1, value=5)
+                                examples = sentiment.category_examples(sentiment_result, display_count)
                                 
                                 col1, col2, col3 = st.columns(3)
                                 with col1:
                                     st.write('😊 积极弹幕:')
-                                    for text in positive[:display_count]:
+                                    for text in examples['积极']:
                                         st.text(text)
                                 with col2:
                                     st.write('😐 中性弹幕:')
-                                    for text in neutral[:display_count]:
+                                    for text in examples['中性']:
                                         st.text(text)
                                 with col3:
                                     st.write('😞 消极弹幕:')
-                                    for text in negative[:display_count]:
+                                    for text in examples['消极']:
                                         st.text(text)
                     if '词云图' in analysis_type:
                         st.subheader('☁️ 词云图生成')
                         with st.spinner('正在生成词云图...'):
-                            texts = [item['text'] for item in danmaku_list]
+                            texts = danmaku_df['text'].tolist()
                             generate_wordcloud(' '.join(texts))
                             
                     if '时间分布' in analysis_type:
                         st.subheader('📈 时间分布分析')
+                        col1, col2, col3 = st.columns(3)
+                        with col1:
+                            bin_rule = st.selectbox(
+                                '分箱方式',
+                                list(timeline.BIN_RULES) + ['fixed'],
+                                format_func=lambda r: timeline.BIN_RULES.get(r, '固定宽度'),
+                                key='timeline_bin_rule'
+                            )
+                        with col2:
+                            rate_window = st.number_input('密度窗口（秒）', min_value=1, value=30, key='timeline_window')
+                        with col3:
+                            peak_count = st.number_input('高能时刻数量', min_value=1, value=5, key='timeline_peaks')
                         with st.spinner('正在分析时间分布...'):
-                            times = [item['time_seconds'] for item in danmaku_list]
-                            fig, ax = plt.subplots(figsize=(12, 6))
-                            ax.hist(times, bins=20, color='skyblue', edgecolor='black')
-                            ax.set_xlabel('Video Time (seconds)', fontsize=12, fontname='Times New Roman')
-                            ax.set_ylabel('Number of Comments', fontsize=12, fontname='Times New Roman')
-                            ax.set_title('Time Distribution of Comments', fontsize=14, pad=15, fontname='Times New Roman')
-                            ax.grid(True, linestyle='--', alpha=0.7)
-                            plt.tight_layout()
+                            # 每秒计数随弹幕表缓存，切换选项时不重新扫描弹幕
+                            base = timeline.per_second_counts(danmaku_df)
+                            if bin_rule == 'fixed':
+                                width = st.number_input('分箱宽度（秒）', min_value=1, value=30, key='timeline_width')
+                            else:
+                                width = timeline.bin_width(base, bin_rule)
+                            edges, counts = timeline.histogram(base, width)
+                            rate = timeline.comment_rate(base, rate_window)
+                            
+                            fig = timeline.plot_distribution(edges, counts, rate)
                             st.pyplot(fig)
+                            import matplotlib.pyplot as plt  # plot_distribution 已加载，这里只取模块
+                            plt.close(fig)
                             
-                            # 提供下载时间分布图的选项
-                            img = io.BytesIO()
-                            plt.savefig(img, format='pdf')
-                            img.seek(0)
+                            # 高能时刻
+                            peaks = timeline.find_peaks(rate, peak_count, rate_window)
+                            if peaks:
+                                st.write('🔥 高能时刻:')
+                                st.dataframe(pd.DataFrame({
+                                    '时间': danmaku_store.format_time([second for second, _ in peaks]).to_numpy(),
+                                    '每分钟弹幕数': [round(value, 1) for _, value in peaks],
+                                }), hide_index=True)
                             
+                            # 提供下载时间分布图的选项（点击时才生成PDF）
                             st.download_button(
                                 label="下载时间分布图",
-                                data=img,
+                                data=exports.figure_pdf_data(
+                                    exports.arrays_key(edges, counts, rate),
+                                    lambda: timeline.plot_distribution(edges, counts, rate)
+                                ),
                                 file_name="time_distribution.pdf",
                                 mime="application/pdf"
                             )
-                            plt.close()
                     # 导出选项
                     export_format = st.selectbox(
                         '💾 选择弹幕导出格式',
@@ -483,32 +559,28 @@ elif page == 'B站弹幕分析':
                     )
                     
                     if export_format == 'CSV':
-                        df = pd.DataFrame(danmaku_list)
-                        csv = df.to_csv(index=False).encode('utf-8-sig')
                         st.download_button(
                             label="下载CSV文件",
-                            data=csv,
+                            data=exports.csv_data(danmaku_df, transform=danmaku_store.export_frame),
                             file_name="danmaku.csv",
                             mime="text/csv"
                         )
                     else:
-                        df = pd.DataFrame(danmaku_list)
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
-                            df.to_excel(tmp.name, index=False)
-                            with open(tmp.name, 'rb') as f:
-                                excel_data = f.read()
-                            st.download_button(
-                                label="下载Excel文件",
-                                data=excel_data,
-                                file_name="danmaku.xlsx",
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                            )
+                        st.download_button(
+                            label="下载Excel文件",
+                            data=exports.excel_data(danmaku_df, transform=danmaku_store.export_frame),
+                            file_name="danmaku.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        )
                             
         except Exception as e:
             st.error(f"获取弹幕失败: {str(e)}")
 
 # 语料清洗部分
 elif page == '语料清洗':
+    import normalize
+    from common import split_words
+
     st.title('语料清洗 🧹')
     
     if '示例文本' not in st.session_state:
@@ -534,7 +606,7 @@ elif page == '语料清洗':
         uploaded_file = st.file_uploader("上传要分析的文件", type=['txt', 'csv'])
         
         if uploaded_file is not None:
-            text_to_clean = uploaded_file.read().decode()
+            text_to_clean = read_uploaded_text(uploaded_file)
         else:
             text_to_clean = st.text_area('或直接输入要分析的文本:', height=200)
     
@@ -547,6 +619,7 @@ elif page == '语料清洗':
         with col2:
             to_lowercase = st.checkbox('转换为小写')
             remove_spaces = st.checkbox('删除多余空格')
+            split_scripts = st.checkbox('中英文之间添加空格')
         
         # 使用session_state来保存清洗后的文本
         if 'cleaned_text' not in st.session_state:
@@ -554,16 +627,15 @@ elif page == '语料清洗':
             
         if st.button('开始清洗'):
             # 执行清洗
-            cleaned_text = text_to_clean
-            if remove_punct:
-                cleaned_text = re.sub(r'[^\w\s]', '', cleaned_text)
-            if remove_numbers:
-                cleaned_text = re.sub(r'\d+', '', cleaned_text)
-            if to_lowercase:
-                cleaned_text = cleaned_text.lower()
-            if remove_spaces:
-                cleaned_text = ' '.join(cleaned_text.split())
-            st.session_state.cleaned_text = cleaned_text
+            # 按勾选的步骤组成清洗流水线，删除类步骤合并为一次替换
+            steps = [step for step, enabled in (
+                ('strip_punct', remove_punct),
+                ('strip_digits', remove_numbers),
+                ('lowercase', to_lowercase),
+                ('split_scripts', split_scripts),
+                ('collapse_spaces', remove_spaces),
+            ) if enabled]
+            st.session_state.cleaned_text = normalize.normalize(text_to_clean, *steps)
         
         if st.session_state.cleaned_text is not None:
             st.subheader('清洗后的文本:')
@@ -584,7 +656,11 @@ elif page == '语料清洗':
 
 # 词频统计与词云图部分（原语言分析部分）
 elif page == '词频统计与词云图':
+    from common import generate_wordcloud, count_word_frequency, count_characters
+
     st.title('词频统计与词云图📊')
+    analysis_text = ""
+    uploaded_file = None
     
     if '示例文本' not in st.session_state:
         st.session_state['示例文本'] = ""
@@ -608,23 +684,24 @@ elif page == '词频统计与词云图':
         # 文件上传
         uploaded_file = st.file_uploader("上传要分析的文件", type=['txt', 'csv'])
         
-        if uploaded_file is not None:
-            analysis_text = uploaded_file.read().decode()
-        else:
+        if uploaded_file is None:
             analysis_text = st.text_area('或直接输入要分析的文本:', height=200)
     
 
-    if analysis_text:
+    if analysis_text or uploaded_file is not None:
         # 分析选项
         analysis_type = st.multiselect(
             '选择分析类型',
             ['词频统计', '字符统计', '词云图']
         )
+        # 上传的文件在词频统计时逐块读取；字符统计和词云图需要完整文本时才整篇解码
+        if not analysis_text and ('字符统计' in analysis_type or '词云图' in analysis_type):
+            analysis_text = read_uploaded_text(uploaded_file)
         
         if '词频统计' in analysis_type:
             st.subheader('📊 词频统计分析')
             with st.spinner('正在进行词频统计...'):
-                count_word_frequency(analysis_text)
+                count_word_frequency(analysis_text or iter_uploaded_text(uploaded_file))
                 
         if '字符统计' in analysis_type:
             st.markdown("""
@@ -649,6 +726,8 @@ elif page == '词频统计与词云图':
 
 # 添加标注工具页面的处理逻辑
 elif page == '标注工具':
+    from common import text_annotation
+
     st.title('文本标注工具 🏷️')
     
     # 添加刷新按钮
@@ -671,10 +750,13 @@ elif page == '标注工具':
         uploaded_file = st.file_uploader("上传要标注的文件", type=['txt', 'csv'])
         
         if uploaded_file is not None:
-            annotation_text = uploaded_file.read().decode()
+            annotation_text = read_uploaded_text(uploaded_file)
         else:
             annotation_text = st.text_area('或直接输入要标注的文本:', height=200)
 
     if annotation_text:
         # 调用标注功能
         text_annotation(annotation_text)
+
+# 记录本次页面运行耗时
+warmup.record_run(time.perf_counter() - _run_start)
@@ -0,0 +1,67 @@
+"""
+字符统计性能对比
+
+对比原先多次扫描文本的 count_characters 实现与 text_stats.character_stats，
+并校验两者结果一致。在仓库根目录运行：
+
+    python benchmarks/char_stats.py [文本重复次数]
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import segmentation
+import text_stats
+
+SAMPLE = "人工智能（Artificial Intelligence, AI）是计算机科学的一个分支，旨在创建能够像人类一样思考和学习的智能机器。" \
+         "AI技术包括机器学习（Machine Learning）、自然语言处理和计算机视觉等，2024年应用越来越广泛！\n"
+
+
+def legacy_character_stats(analysis_text):
+    """原 common.count_characters 中的统计逻辑"""
+    char_count_no_space = len([c for c in analysis_text if not c.isspace()])
+    valid_chars = len([c for c in analysis_text if c.isalnum() or '\u4e00' <= c <= '\u9fff'])
+    chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', analysis_text))
+    english_chars = len(re.findall(r'[a-zA-Z]', analysis_text))
+    numbers = len(re.findall(r'\d', analysis_text))
+    spaces = len(re.findall(r'\s', analysis_text))
+    punctuation = len([c for c in analysis_text if re.match(r'[^\w\s]', c)])
+    english_words = len([word for word in analysis_text.split() if re.match(r'[a-zA-Z]+', word)])
+    chinese_text = ''.join(re.findall(r'[\u4e00-\u9fff]+', analysis_text))
+    chinese_words = len(segmentation.cut(chinese_text))
+    return {
+        'total': len(analysis_text),
+        'no_space': char_count_no_space,
+        'valid': valid_chars,
+        'chinese_chars': chinese_chars,
+        'english_chars': english_chars,
+        'numbers': numbers,
+        'spaces': spaces,
+        'punctuation': punctuation,
+        'english_words': english_words,
+        'chinese_words': chinese_words,
+        'total_words': english_words + chinese_words,
+    }
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    text = SAMPLE * repeat
+    print(f'文本长度: {len(text)} 字符')
+
+    # 预先分词，两种实现都命中分词缓存，只比较字符统计本身
+    assert legacy_character_stats(text) == text_stats.character_stats(text)
+
+    legacy = min(timeit.repeat(lambda: legacy_character_stats(text), number=1, repeat=3))
+    # character_stats 会缓存结果，这里直接测量未缓存的统计函数，否则只测到缓存命中
+    fast = min(timeit.repeat(lambda: text_stats._character_stats(text), number=1, repeat=3))
+    print(f'原实现: {legacy:.3f} 秒')
+    print(f'单次遍历: {fast:.3f} 秒')
+    print(f'加速比: {legacy / fast:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+启动延迟测量
+
+每项测量都在新的 Python 进程中进行（冷启动）：
+- 导入耗时：原先 app.py 顶部一次性导入的全部模块，与现在页面脚本顶部导入的模块；
+- 首次分析耗时：不预热时第一次分词 / SnowNLP 打分的耗时，与预热完成后的耗时。
+
+在仓库根目录运行：
+
+    python benchmarks/startup.py [重复次数]
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 改动前 app.py 顶部的导入（不含仓库内的模块，它们的内容已经改变）
+LEGACY_IMPORTS = """
+import streamlit, pandas, numpy, re, jieba, io, requests, base64, tempfile, copy
+from collections import Counter
+from snownlp import SnowNLP
+from wordcloud import WordCloud
+import matplotlib.pyplot
+from PIL import Image
+"""
+
+CURRENT_IMPORTS = """
+import streamlit, pandas, html, caching, warmup, textio
+"""
+
+FIRST_ANALYSIS = """
+import time
+import warmup
+if {warm}:
+    warmup.start()
+    warmup.wait()
+import segmentation, sentiment
+start = time.perf_counter()
+segmentation.cut('人工智能是计算机科学的一个分支。')
+sentiment.score_text('这个视频真好看', 'snownlp')
+print(time.perf_counter() - start)
+"""
+
+TIMED_IMPORTS = """
+import time
+start = time.perf_counter()
+{imports}
+print(time.perf_counter() - start)
+"""
+
+
+def measure(code, repeat):
+    """在新进程中执行 code（最后一行输出耗时），返回 repeat 次中的最短耗时"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    results = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(float(output.strip().splitlines()[-1]))
+    return min(results)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    rows = [
+        ('页面脚本导入（原先）', TIMED_IMPORTS.format(imports=LEGACY_IMPORTS)),
+        ('页面脚本导入（现在）', TIMED_IMPORTS.format(imports=CURRENT_IMPORTS)),
+        ('首次分词+情感分析（未预热）', FIRST_ANALYSIS.format(warm=False)),
+        ('首次分词+情感分析（预热后）', FIRST_ANALYSIS.format(warm=True)),
+    ]
+    for name, code in rows:
+        print(f'{name}: {measure(code, repeat):.3f} 秒')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+用户词典加载耗时测量
+
+生成一个随机词典（默认 10 万词），在新的 Python 进程中分别测量：
+- 重建：从默认词典开始逐条添加用户词语（没有磁盘缓存时的首次加载）；
+- 读取缓存：直接读取合并后的前缀词典缓存（之后的加载以及 spawn 方式创建的工作进程）。
+
+词典和缓存写入临时目录，不影响 data/ 中的用户词典。在仓库根目录运行：
+
+    python benchmarks/userdict.py [词语数] [重复次数]
+"""
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOAD = """
+import time
+import segmentation, userdict
+start = time.perf_counter()
+userdict.apply()
+print(time.perf_counter() - start)
+"""
+
+
+def measure(env, repeat, clear_dir=None):
+    """在新进程中加载用户词典，返回 repeat 次中的最短耗时；clear_dir 不为空时每次先删除缓存"""
+    results = []
+    for _ in range(repeat):
+        if clear_dir:
+            shutil.rmtree(clear_dir, ignore_errors=True)
+        output = subprocess.run(
+            [sys.executable, '-c', LOAD], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(float(output.strip().splitlines()[-1]))
+    return min(results)
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    random.seed(0)
+    chars = [chr(c) for c in range(0x4e00, 0x4e00 + 3000)]
+    words = {''.join(random.choices(chars, k=random.randint(2, 5))) for _ in range(size)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dict_dir = os.path.join(tmp, 'userdict')
+        cache_dir = os.path.join(tmp, 'cache')
+        os.makedirs(dict_dir)
+        with open(os.path.join(dict_dir, 'random.txt'), 'w', encoding='utf-8') as f:
+            f.writelines(f'{word} 10 nz\n' for word in words)
+        env = dict(os.environ, PYTHONPATH=ROOT, USERDICT_DIR=dict_dir, JIEBA_CACHE_DIR=cache_dir)
+
+        print(f'用户词典: {len(words)} 词')
+        print(f'重建: {measure(env, repeat, clear_dir=cache_dir):.3f} 秒')
+        print(f'读取缓存: {measure(env, repeat):.3f} 秒')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,461 @@
+"""
+B站弹幕获取与解析模块
+
+弹幕接口返回的 XML 直接从响应流中增量解析（iterparse），
+每条 <d> 元素解析后立即释放，结果按列收集，最后整理为紧凑的弹幕表
+（见 danmaku_store）。
+
+所有请求共用一个带连接池、超时和失败重试的 requests.Session；
+视频页面和解析后的弹幕在内存中按 URL / cid 缓存，
+页面重新运行（例如切换分析选项）时不会重复下载。
+
+多个视频、多P视频的全部分P可以通过线程池并发获取，合并为一份带来源标记的弹幕表。
+
+除 list.so（XML，只返回有上限的部分弹幕）外，还支持分段接口 seg.so：
+每 6 分钟一个 protobuf 分段，全部分段并发下载，分段较多时在进程池中并行解码。
+"""
+import math
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import danmaku_proto
+import danmaku_store
+from caching import TTLCache, register_cache
+
+HEADERS = {
+    'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'referer': 'https://www.bilibili.com'
+}
+
+DANMAKU_XML_URL = 'https://api.bilibili.com/x/v1/dm/list.so?oid={cid}'
+DANMAKU_SEG_URL = 'https://api.bilibili.com/x/v2/dm/web/seg.so?type=1&oid={cid}&segment_index={index}'
+PAGELIST_URL = 'https://api.bilibili.com/x/player/pagelist?bvid={bvid}'
+
+# 每个弹幕分段覆盖的视频时长（秒）
+SEGMENT_SECONDS = 6 * 60
+# 视频时长未知时逐批探测分段：连续遇到这么多个空分段才认为已到视频结尾
+# （中间没有弹幕的 6 分钟也会返回空分段）
+MAX_EMPTY_SEGMENTS = 5
+# 探测的分段数上限（24 小时）
+MAX_PROBE_SEGMENTS = 240
+# 分段数达到该值时在进程池中解码
+PARALLEL_DECODE_THRESHOLD = 4
+# 解码进程数
+DECODE_WORKERS = os.cpu_count() or 1
+
+# (连接超时, 读取超时)，单位秒
+TIMEOUT = (5, 30)
+# 失败重试次数及退避系数（第 n 次重试前等待 backoff * 2^(n-1) 秒）
+RETRIES = 3
+RETRY_BACKOFF = 0.5
+# 连接池大小
+POOL_SIZE = 16
+# 批量获取时的最大并发请求数（不超过连接池大小）
+FETCH_WORKERS = 8
+# 缓存有效期（秒）与条目数上限（足以容纳一次批量获取的全部视频和分P）
+CACHE_TTL = 600
+CACHE_MAX_ENTRIES = 1024
+# 视频页面和弹幕表缓存的内存上限（字节），超出后按最近最少使用的顺序淘汰
+PAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DANMAKU_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+_page_cache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, max_bytes=PAGE_CACHE_MAX_BYTES, sizeof=len)
+_pagelist_cache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+_danmaku_cache = TTLCache(
+    maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL,
+    max_bytes=DANMAKU_CACHE_MAX_BYTES, sizeof=danmaku_store.memory_usage
+)
+
+# XML 1.0 不允许出现的控制字符（弹幕内容中偶尔会出现，导致解析失败）。
+# 这些字节不会出现在 UTF-8 多字节字符内部，可以直接按字节删除。
+_INVALID_XML_BYTES = bytes(b for b in range(0x20) if b not in (0x09, 0x0A, 0x0D))
+_READ_SIZE = 64 * 1024
+
+
+class _XMLSanitizer:
+    """包装二进制流，读取时去除 XML 非法控制字符"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def read(self, size=_READ_SIZE):
+        if size is None or size < 0:
+            size = _READ_SIZE
+        return self._stream.read(size).translate(None, _INVALID_XML_BYTES)
+
+
+def get_session():
+    """返回进程内共享的 requests.Session（长连接复用、自动重试）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=RETRIES,
+                backoff_factor=RETRY_BACKOFF,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET']),
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def fetch_video_page(url):
+    """
+    获取视频页面 HTML（按 URL 缓存）
+
+    Returns:
+        页面文本
+    """
+    def download():
+        response = get_session().get(url, timeout=TIMEOUT)
+        response.raise_for_status()
+        return response.text
+
+    return _page_cache.get_or_compute(url, download)
+
+
+def extract_cid(html):
+    """从视频页面 HTML 中提取 cid，找不到时返回 None"""
+    match = re.search(r'"cid":(\d+)', html)
+    return match.group(1) if match else None
+
+
+def extract_bvid(url):
+    """从视频 URL 中提取 BV 号，找不到时返回 None"""
+    match = re.search(r'BV[0-9A-Za-z]{10}', url)
+    return match.group(0) if match else None
+
+
+def split_urls(text):
+    """把以空白或逗号分隔的多个 URL 拆分为列表"""
+    return [url for url in re.split(r'[\s,，]+', text) if url]
+
+
+def fetch_pagelist(bvid, url_template=PAGELIST_URL):
+    """
+    获取视频的全部分P（按 BV 号缓存）
+
+    Returns:
+        [{'cid': ..., 'page': 分P序号, 'part': 分P标题, 'duration': 时长(秒)}, ...]
+    """
+    url = url_template.format(bvid=bvid)
+
+    def download():
+        response = get_session().get(url, timeout=TIMEOUT)
+        response.raise_for_status()
+        payload = response.json()
+        if payload.get('code') != 0:
+            raise ValueError(f"获取分P列表失败: {payload.get('message')}")
+        return [
+            {'cid': str(item['cid']), 'page': item['page'], 'part': item['part'], 'duration': item.get('duration')}
+            for item in payload['data']
+        ]
+
+    return _pagelist_cache.get_or_compute(url, download)
+
+
+def _resolve(url, all_parts):
+    # 返回该 URL 对应的 [(来源, 分P标题, cid, 时长), ...]，时长未知时为 None
+    bvid = extract_bvid(url)
+    source = bvid or url
+    if all_parts and bvid:
+        return [
+            (source, f"P{p['page']} {p['part']}", p['cid'], p['duration'])
+            for p in fetch_pagelist(bvid)
+        ]
+    cid = extract_cid(fetch_video_page(url))
+    if not cid:
+        return []
+    # 时长只有分段接口需要，到 fetch_batch 使用分段接口时再查
+    return [(source, 'P1', cid, None)]
+
+
+def _part_duration(bvid, cid):
+    # 视频页面中没有可靠的时长信息，从分P列表中查找；获取失败时返回 None，分段接口改为逐批探测
+    try:
+        pages = fetch_pagelist(bvid)
+    except (requests.RequestException, ValueError, KeyError):
+        return None
+    return next((p['duration'] for p in pages if p['cid'] == cid), None)
+
+
+def resolve_targets(urls, all_parts=False):
+    """
+    并发解析多个视频 URL，得到需要获取弹幕的全部分P
+
+    Args:
+        urls: 视频 URL 列表
+        all_parts: 是否获取多P视频的全部分P；否则只取页面中的第一个 cid
+
+    Returns:
+        (targets, failed)：targets 为 [(来源, 分P标题, cid, 时长), ...]（只取第一个 cid 时时长为 None，
+        由 fetch_batch 在使用分段接口时再查询），failed 为 [(URL, 失败原因), ...]，单个 URL 失败不影响其它 URL
+    """
+    def resolve(url):
+        try:
+            return _resolve(url, all_parts), None
+        except Exception as e:
+            return [], f'{type(e).__name__}: {e}'
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        resolved = list(executor.map(resolve, urls))
+    targets = []
+    failed = []
+    for url, (items, error) in zip(urls, resolved):
+        if items:
+            targets.extend(items)
+        else:
+            failed.append((url, error or '页面中找不到 cid'))
+    return targets, failed
+
+
+def parse_danmaku_xml(stream):
+    """
+    增量解析弹幕 XML
+
+    <d> 元素的 p 属性依次为：出现时间(秒)、模式、字号、颜色、发送时间戳、
+    弹幕池、发送者哈希、弹幕 ID（新版接口还会附加权重，忽略）。
+
+    Args:
+        stream: 可读取字节的文件对象（如 requests 响应的 raw 流）
+
+    Returns:
+        按出现时间排序的弹幕 DataFrame，各列见 danmaku_store.build_store
+    """
+    time_seconds = array('d')
+    mode = array('b')
+    fontsize = array('h')
+    color = array('i')
+    send_time = array('q')
+    pool = array('b')
+    user_hash = []
+    row_id = array('q')
+    texts = []
+
+    root = None
+    for event, elem in ET.iterparse(_XMLSanitizer(stream), events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            continue
+        if elem.tag != 'd':
+            continue
+        fields = elem.get('p', '').split(',')
+        if len(fields) >= 8:
+            time_seconds.append(float(fields[0]))
+            mode.append(int(fields[1]))
+            fontsize.append(int(fields[2]))
+            color.append(int(fields[3]))
+            send_time.append(int(fields[4]))
+            pool.append(int(fields[5]))
+            user_hash.append(fields[6])
+            row_id.append(int(fields[7]))
+            texts.append((elem.text or '').strip())
+        # 解析完立即从根节点上移除，内存占用不随文档大小增长
+        root.clear()
+
+    return danmaku_store.build_store(
+        time_seconds, mode, fontsize, color, send_time, pool, user_hash, row_id, texts
+    )
+
+
+def fetch_danmaku(cid, url_template=DANMAKU_XML_URL):
+    """
+    下载并解析指定 cid 的弹幕，边下载边解析（按 cid 缓存解析结果）
+
+    Args:
+        cid: 视频分P的 cid
+        url_template: 弹幕接口地址模板，包含 {cid} 占位符
+
+    Returns:
+        弹幕 DataFrame（缓存共享的对象，调用方不应原地修改）
+    """
+    url = url_template.format(cid=cid)
+
+    def download():
+        with get_session().get(url, timeout=TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            # 由 urllib3 负责解压 deflate/gzip 编码的响应
+            response.raw.decode_content = True
+            return parse_danmaku_xml(response.raw)
+
+    return _danmaku_cache.get_or_compute(url, download)
+
+
+def _fetch_segment(cid, index, url_template):
+    # 返回分段的原始字节；超出视频时长的分段返回空内容
+    response = get_session().get(url_template.format(cid=cid, index=index), timeout=TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+
+_segment_executor = None
+_decode_pool = None
+_executor_lock = threading.Lock()
+
+
+def _get_segment_executor():
+    # 全部分P共用一个下载线程池：并发获取多个分P时，总并发请求数仍不超过 FETCH_WORKERS
+    global _segment_executor
+    with _executor_lock:
+        if _segment_executor is None:
+            _segment_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='danmaku-seg')
+        return _segment_executor
+
+
+def _trailing_empty(payloads):
+    count = 0
+    for payload in reversed(payloads):
+        if payload:
+            break
+        count += 1
+    return count
+
+
+def _download_segments(cid, duration, url_template):
+    """
+    并发下载全部分段
+
+    已知视频时长时一次性请求全部分段；否则每次并发请求一批，
+    直到连续遇到 MAX_EMPTY_SEGMENTS 个空分段为止（中间的空分段保留）。
+    """
+    executor = _get_segment_executor()
+
+    def fetch(indexes):
+        return list(executor.map(lambda i: _fetch_segment(cid, i, url_template), indexes))
+
+    if duration:
+        return fetch(range(1, max(1, math.ceil(duration / SEGMENT_SECONDS)) + 1))
+    payloads = []
+    while len(payloads) < MAX_PROBE_SEGMENTS:
+        payloads.extend(fetch(range(len(payloads) + 1, len(payloads) + FETCH_WORKERS + 1)))
+        empty = _trailing_empty(payloads)
+        if empty >= MAX_EMPTY_SEGMENTS:
+            return payloads[:len(payloads) - empty]
+    return payloads
+
+
+def _get_decode_pool():
+    global _decode_pool
+    with _executor_lock:
+        if _decode_pool is None:
+            _decode_pool = ProcessPoolExecutor(max_workers=DECODE_WORKERS)
+        return _decode_pool
+
+
+def _reset_decode_pool():
+    global _decode_pool
+    with _executor_lock:
+        if _decode_pool is not None:
+            _decode_pool.shutdown(wait=False, cancel_futures=True)
+        _decode_pool = None
+
+
+def _decode_segments(payloads):
+    """
+    解码全部分段，结果按分段顺序返回
+
+    分段较多时在共用的进程池中并行解码；进程池不可用时退回到当前进程解码。
+    """
+    if len(payloads) >= PARALLEL_DECODE_THRESHOLD and DECODE_WORKERS > 1:
+        try:
+            return list(_get_decode_pool().map(danmaku_proto.decode_segment, payloads))
+        except (BrokenProcessPool, OSError):
+            _reset_decode_pool()
+    return [danmaku_proto.decode_segment(payload) for payload in payloads]
+
+
+def fetch_danmaku_segments(cid, duration=None, url_template=DANMAKU_SEG_URL):
+    """
+    通过分段接口获取指定 cid 的全部弹幕（按 cid 缓存解析结果）
+
+    Args:
+        cid: 视频分P的 cid
+        duration: 视频时长（秒），用于计算分段数；为 None 时逐批探测，直到连续出现多个空分段
+        url_template: 分段接口地址模板，包含 {cid} 和 {index} 占位符
+
+    Returns:
+        弹幕 DataFrame，与 fetch_danmaku 的结构相同
+    """
+    key = url_template.format(cid=cid, index='*')
+
+    def download():
+        segments = _decode_segments(_download_segments(cid, duration, url_template))
+        return danmaku_store.build_store(*danmaku_proto.merge_segments(segments))
+
+    return _danmaku_cache.get_or_compute(key, download)
+
+
+def _fetch_target_segments(target, url_template):
+    source, _, cid, duration = target
+    if duration is None:
+        # 单P解析时没有查询时长；来源为 BV 号时从分P列表补上，避免逐批探测
+        bvid = extract_bvid(source)
+        if bvid:
+            duration = _part_duration(bvid, cid)
+    return fetch_danmaku_segments(cid, duration, url_template)
+
+
+def fetch_batch(targets, segmented=False, url_template=None):
+    """
+    并发获取多个分P的弹幕并合并
+
+    Args:
+        targets: resolve_targets 返回的 [(来源, 分P标题, cid, 时长), ...]
+        segmented: 是否使用分段接口获取全部弹幕
+        url_template: 可选，弹幕接口地址模板，默认为 DANMAKU_SEG_URL 或 DANMAKU_XML_URL
+
+    Returns:
+        合并后的弹幕 DataFrame；来自多个分P时附加 source（来源）和 part（分P）两列
+    """
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        if segmented:
+            template = url_template or DANMAKU_SEG_URL
+            # 各分P的分段请求都提交到共用的分段下载线程池，这里的线程只等待结果
+            stores = list(executor.map(lambda target: _fetch_target_segments(target, template), targets))
+        else:
+            template = url_template or DANMAKU_XML_URL
+            stores = list(executor.map(lambda target: fetch_danmaku(target[2], template), targets))
+    if len(stores) == 1:
+        return stores[0]
+    # 合并结果同样缓存：页面重新运行时返回同一个对象，依赖弹幕表的计算（如 timeline 的每秒计数）可以直接复用
+    key = ('batch', template, tuple(targets))
+    return _danmaku_cache.get_or_compute(key, lambda: danmaku_store.concat_stores(stores, labels={
+        'source': [source for source, _, _, _ in targets],
+        'part': [part for _, part, _, _ in targets],
+    }))
+
+
+def cache_stats():
+    """返回各缓存的命中统计"""
+    return {
+        'pages': _page_cache.stats(),
+        'pagelists': _pagelist_cache.stats(),
+        'danmaku': _danmaku_cache.stats(),
+    }
+
+
+def clear_cache():
+    _page_cache.clear()
+    _pagelist_cache.clear()
+    _danmaku_cache.clear()
+
+
+register_cache('B站接口', cache_stats, clear_cache)
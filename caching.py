@@ -0,0 +1,144 @@
+"""
+缓存工具模块
+
+提供按过期时间和条目数限制大小的内存缓存，以及全局的缓存登记表：
+各模块把自己的缓存统计和清空函数登记在这里，页面上可以统一查看命中情况和清空。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    带过期时间的 LRU 缓存
+
+    Args:
+        maxsize: 最大条目数，超出后淘汰最久未使用的条目
+        ttl: 条目有效期（秒）
+        max_bytes: 可选，全部条目的总大小上限，超出后同样按最久未使用的顺序淘汰
+        sizeof: 计算条目大小（字节）的函数，设置 max_bytes 时必须提供
+    """
+
+    def __init__(self, maxsize=128, ttl=600, max_bytes=None, sizeof=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return default
+
+    def _remove(self, key):
+        self._size -= self._entries.pop(key)[2]
+
+    def set(self, key, value):
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            # 单个条目超过总大小上限时不缓存，避免把其它条目全部挤出
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self._size += size
+            while len(self._entries) > self.maxsize or (self.max_bytes is not None and self._size > self.max_bytes):
+                self._size -= self._entries.popitem(last=False)[1][2]
+
+    def get_or_compute(self, key, compute):
+        """
+        命中缓存时直接返回，否则调用 compute() 计算并写入缓存
+
+        Args:
+            key: 缓存键
+            compute: 无参数的计算函数
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+            }
+            if self.max_bytes is not None:
+                stats['bytes'] = self._size
+            return stats
+
+
+# 缓存登记表：{名称: (统计函数, 清空函数)}
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def register_cache(name, stats, clear):
+    """
+    登记一个模块的缓存
+
+    Args:
+        name: 显示名称
+        stats: 无参函数，返回 {'hits', 'misses', 'entries', ...}，
+               或 {子缓存名称: 统计字典} 形式的多个缓存统计
+        clear: 无参函数，清空该模块的缓存
+    """
+    with _registry_lock:
+        _registry[name] = (stats, clear)
+
+
+def registered_stats():
+    """
+    全部已登记缓存的统计
+
+    Returns:
+        [{'cache': 名称, 'hits': ..., 'misses': ..., 'entries': ..., 'hit_rate': ...}, ...]
+    """
+    with _registry_lock:
+        registry = list(_registry.items())
+    rows = []
+    for name, (stats, _) in registry:
+        result = stats()
+        if 'hits' in result:
+            result = {None: result}
+        for sub, values in result.items():
+            lookups = values['hits'] + values['misses']
+            rows.append({
+                'cache': name if sub is None else f'{name}/{sub}',
+                'hits': values['hits'],
+                'misses': values['misses'],
+                'entries': values['entries'],
+                'hit_rate': values['hits'] / lookups if lookups else 0.0,
+            })
+    return rows
+
+
+def clear_all():
+    """清空全部已登记的缓存"""
+    with _registry_lock:
+        clears = [clear for _, clear in _registry.values()]
+    for clear in clears:
+        clear()
@@ -0,0 +1,338 @@
+"""
+批量文本分析命令行工具
+
+不启动 Streamlit，直接对目录中的文本文件批量运行分词、词频统计、字符统计、
+情感分析和词云图生成，结果写出为 CSV/Parquet 表格和 PNG 图片。
+文件分发到进程池中并行处理，适合定时任务处理大量语料。
+
+示例（在仓库根目录运行）：
+
+    python cli.py corpus/ -o results/ --tasks freq,chars,sentiment --workers 8
+    python cli.py a.txt b.txt -o results/ --tasks wordcloud --remove-stopwords
+    python cli.py corpus/ -o results/ --remove-stopwords --stopword-lists default,snownlp,english
+
+输出：
+    char_stats.csv        每个文件一行的字符统计
+    word_frequency.csv    每个文件的前 N 个高频词（file, word, count）
+    corpus_frequency.csv  全部文件合并后的前 N 个高频词
+    sentiment.csv         每个文件按句计算的情感统计
+    tokens/<文件>.txt     分词结果（词语间以空格分隔）
+    wordclouds/<文件>.png 词云图
+    errors.csv            处理失败的文件及原因（没有失败时不生成）
+
+<文件> 为输入文件的相对名称（保留扩展名），例如 a.txt 的词云图为 wordclouds/a.txt.png。
+"""
+import argparse
+import contextlib
+import functools
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import normalize
+import segmentation
+import sentiment
+import stopwords as stopword_lists
+import text_stats
+import textio
+import userdict
+
+TASKS = ('tokens', 'freq', 'chars', 'sentiment', 'wordcloud')
+# 需要完整文本的任务；只有分词和词频时逐块读取文件
+FULL_TEXT_TASKS = frozenset({'chars', 'sentiment', 'wordcloud'})
+FORMATS = ('csv', 'parquet')
+DEFAULT_EXTENSIONS = ('.txt', '.csv')
+
+# 工作进程中的缓存上限：每个文件只处理一次，缓存只需容纳当前文件（或当前文本块）的中间结果
+WORKER_TOKEN_CACHE_BYTES = 64 * 1024 * 1024
+WORKER_RESULT_CACHE_SIZE = 4
+
+
+def find_files(inputs, extensions=DEFAULT_EXTENSIONS, recursive=True):
+    """
+    收集待处理的文件
+
+    Args:
+        inputs: 文件或目录路径列表
+        extensions: 目录中要处理的文件扩展名
+        recursive: 是否递归子目录
+
+    Returns:
+        [(文件路径, 输出用的相对名称), ...]，按路径排序。直接给出的文件以文件名命名，
+        目录中的文件以相对于该目录的路径命名；不同文件名称相同时（如 a/x.txt 和 b/x.txt）
+        改用相对于它们共同上级目录的路径，输出不会互相覆盖
+    """
+    files = {}
+    for path in inputs:
+        if os.path.isfile(path):
+            files.setdefault(os.path.abspath(path), (path, os.path.basename(path)))
+            continue
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f'找不到输入路径: {path}')
+        for root, dirs, names in os.walk(path):
+            if not recursive:
+                dirs.clear()
+            for name in names:
+                if name.lower().endswith(extensions):
+                    full = os.path.join(root, name)
+                    files.setdefault(os.path.abspath(full), (full, os.path.relpath(full, path)))
+
+    by_name = {}
+    for full, name in files.values():
+        by_name.setdefault(name, []).append(full)
+    result = []
+    for name, paths in by_name.items():
+        if len(paths) == 1:
+            result.append((paths[0], name))
+            continue
+        common = os.path.commonpath([os.path.abspath(p) for p in paths])
+        result.extend((p, os.path.relpath(os.path.abspath(p), common)) for p in paths)
+    return sorted(result)
+
+
+def _init_worker(dictionary):
+    # spawn 方式创建的进程不会继承主进程的用户词典，需要重新加载
+    segmentation._init_worker(dictionary)
+    # 进程池中的每个进程只处理一个文件，不再为单个文件启动嵌套的进程池
+    segmentation.PARALLEL_THRESHOLD = float('inf')
+    sentiment.PARALLEL_THRESHOLD = float('inf')
+    # 文件各不相同，缓存几乎不会命中；按交互使用设定的缓存上限会让每个进程各占一份内存
+    segmentation._cache.max_bytes = WORKER_TOKEN_CACHE_BYTES
+    segmentation._pos_cache.max_bytes = 0
+    text_stats._results.maxsize = WORKER_RESULT_CACHE_SIZE
+    sentiment.CACHE_MAX_ENTRIES = 0
+
+
+def _output_path(out_dir, kind, name, suffix):
+    # 保留原扩展名（a.txt -> a.txt.png），a.txt 和 a.csv 的输出不会互相覆盖
+    path = os.path.join(out_dir, kind, name + suffix)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def _tee_tokens(chunks, f):
+    """逐块把分词结果写入 f（词语间以空格分隔），原样产出文本块"""
+    separator = ''
+    for chunk in chunks:
+        words = [w for w in segmentation.cut(chunk) if not w.isspace()]
+        if words:
+            f.write(separator + ' '.join(words))
+            separator = ' '
+        yield chunk
+
+
+def analyze_file(item, tasks, out_dir, stopwords=None, remove_punctuation=False,
+                 remove_numbers=False, backend=sentiment.DEFAULT_BACKEND, font_path=None):
+    """
+    分析单个文件（在工作进程中运行）
+
+    Args:
+        item: (文件路径, 相对名称)
+        tasks: 要执行的任务集合，见 TASKS
+        out_dir: 输出目录（分词结果和词云图直接写入）
+        其余参数与命令行选项对应
+
+    Returns:
+        {'file': 相对名称, 'chars': {...}, 'freq': Counter, 'sentiment': {...}, 'error': 错误信息}，
+        只包含执行了的任务
+    """
+    path, name = item
+    result = {'file': name}
+    try:
+        # 分词和词频逐块处理；其它任务需要完整文本时才整篇读入
+        text = textio.read_text_file(path) if FULL_TEXT_TASKS.intersection(tasks) else None
+        chunks = [text] if text is not None else textio.iter_text_file(path)
+        with contextlib.ExitStack() as stack:
+            if 'tokens' in tasks:
+                f = stack.enter_context(open(_output_path(out_dir, 'tokens', name, '.txt'), 'w', encoding='utf-8'))
+                chunks = _tee_tokens(chunks, f)
+            if 'freq' in tasks:
+                result['freq'] = text_stats.word_frequency(
+                    chunks, remove_punctuation=remove_punctuation, stopwords=stopwords, remove_numbers=remove_numbers
+                )
+            else:
+                for _ in chunks:
+                    pass
+        if 'chars' in tasks:
+            result['chars'] = text_stats.character_stats(text)
+        if 'sentiment' in tasks:
+            sentences = normalize.split_sentences(text)
+            df = sentiment.sentiment_frame(sentences, sentiment.score_texts(sentences, backend, parallel=False))
+            result['sentiment'] = {
+                'sentences': len(df),
+                'mean_sentiment': float(df['sentiment'].mean()) if len(df) else float('nan'),
+                **sentiment.category_counts(df).to_dict(),
+            }
+        if 'wordcloud' in tasks:
+            frequencies = text_stats.wordcloud_frequencies(text, stopwords)
+            if frequencies:
+                import wordcloud_render  # 只在需要时加载字体和 wordcloud
+                image = wordcloud_render.render(
+                    frequencies, font_path=font_path or wordcloud_render.FONT_PATH, cache=False
+                )
+                image.save(_output_path(out_dir, 'wordclouds', name, '.png'))
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    return result
+
+
+def write_table(df, out_dir, name, fmt):
+    """按指定格式写出表格，返回文件路径"""
+    path = os.path.join(out_dir, f'{name}.{fmt}')
+    if fmt == 'parquet':
+        try:
+            df.to_parquet(path, index=False)
+        except ImportError as e:
+            raise SystemExit(f'写出 Parquet 需要安装 pyarrow 或 fastparquet: {e}')
+    else:
+        df.to_csv(path, index=False, encoding='utf-8-sig')
+    return path
+
+
+def run(files, tasks, out_dir, workers=None, fmt='csv', top_n=50, progress=None, **options):
+    """
+    批量分析文件并写出汇总表格
+
+    Args:
+        files: find_files 的返回值
+        tasks: 要执行的任务集合
+        out_dir: 输出目录
+        workers: 进程数，为 1 时在当前进程中处理
+        fmt: 表格格式，'csv' 或 'parquet'
+        top_n: 每个文件及全部文件合并后保留的高频词数
+        progress: 可选，每处理完一个文件调用一次 progress(已完成数, 总数, 结果)
+        **options: 传给 analyze_file 的其它选项
+
+    Returns:
+        {表格名称: 文件路径}
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    worker = functools.partial(analyze_file, tasks=tasks, out_dir=out_dir, **options)
+    workers = workers or os.cpu_count() or 1
+
+    chars, freq_rows, sentiments, errors = [], [], [], []
+    corpus = Counter()
+
+    def collect(results):
+        for done, result in enumerate(results, 1):
+            name = result['file']
+            if 'error' in result:
+                errors.append({'file': name, 'error': result['error']})
+            if 'chars' in result:
+                chars.append({'file': name, **result['chars']})
+            if 'freq' in result:
+                corpus.update(result['freq'])
+                freq_rows.extend(
+                    {'file': name, 'word': word, 'count': count}
+                    for word, count in text_stats.top_words(result['freq'], top_n)
+                )
+            if 'sentiment' in result:
+                sentiments.append({'file': name, **result['sentiment']})
+            if progress is not None:
+                progress(done, len(files), result)
+
+    if workers == 1 or len(files) < 2:
+        collect(map(worker, files))
+    else:
+        # 一次分发多个文件，减少进程间通信次数
+        chunksize = max(1, len(files) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(segmentation._dictionary,)) as pool:
+            collect(pool.map(worker, files, chunksize=chunksize))
+
+    written = {}
+    if 'chars' in tasks:
+        written['char_stats'] = write_table(pd.DataFrame(chars), out_dir, 'char_stats', fmt)
+    if 'freq' in tasks:
+        written['word_frequency'] = write_table(
+            pd.DataFrame(freq_rows, columns=['file', 'word', 'count']), out_dir, 'word_frequency', fmt
+        )
+        written['corpus_frequency'] = write_table(
+            pd.DataFrame(text_stats.top_words(corpus, top_n), columns=['word', 'count']), out_dir, 'corpus_frequency', fmt
+        )
+    if 'sentiment' in tasks:
+        written['sentiment'] = write_table(pd.DataFrame(sentiments), out_dir, 'sentiment', fmt)
+    if errors:
+        written['errors'] = write_table(pd.DataFrame(errors), out_dir, 'errors', 'csv')
+    return written
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='批量文本分析（分词、词频、字符统计、情感分析、词云图）')
+    parser.add_argument('inputs', nargs='+', help='要分析的文件或目录')
+    parser.add_argument('-o', '--output', required=True, help='输出目录')
+    parser.add_argument('--tasks', default='freq,chars',
+                        help=f'要执行的任务，用逗号分隔，可选: {",".join(TASKS)}（默认: freq,chars）')
+    parser.add_argument('--format', choices=FORMATS, default='csv', help='表格输出格式（默认: csv）')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认: CPU 核数）')
+    parser.add_argument('--ext', default=','.join(DEFAULT_EXTENSIONS), help='目录中要处理的文件扩展名（默认: .txt,.csv）')
+    parser.add_argument('--no-recursive', action='store_true', help='不处理子目录')
+    parser.add_argument('--top', type=int, default=50, help='保留的高频词数（默认: 50）')
+    parser.add_argument('--remove-stopwords', action='store_true', help='词频和词云图中去除停用词')
+    parser.add_argument('--stopword-lists', default=','.join(stopword_lists.DEFAULT_LISTS),
+                        help=f'去除停用词时使用的停用词表，用逗号分隔，可选: {",".join(stopword_lists.list_paths())}'
+                             f'（默认: {",".join(stopword_lists.DEFAULT_LISTS)}）')
+    parser.add_argument('--extra-stopwords', default='', help='额外的停用词，用逗号分隔')
+    parser.add_argument('--remove-punctuation', action='store_true', help='词频中去除标点符号')
+    parser.add_argument('--remove-numbers', action='store_true', help='词频中去除数字')
+    parser.add_argument('--sentiment-backend', choices=sorted(sentiment.available_backends()),
+                        default=sentiment.DEFAULT_BACKEND, help='情感计算后端')
+    parser.add_argument('--font', default=None, help='词云图使用的字体文件（默认: wordcloud_render.FONT_PATH）')
+    args = parser.parse_args(argv)
+
+    args.tasks = {task.strip() for task in args.tasks.split(',') if task.strip()}
+    unknown = args.tasks - set(TASKS)
+    if unknown:
+        parser.error(f'未知的任务: {",".join(sorted(unknown))}')
+    args.stopword_lists = [name.strip() for name in args.stopword_lists.split(',') if name.strip()]
+    unknown = set(args.stopword_lists) - set(stopword_lists.list_paths())
+    if unknown:
+        parser.error(f'未知的停用词表: {",".join(sorted(unknown))}')
+    args.ext = tuple(ext.strip().lower() for ext in args.ext.split(',') if ext.strip())
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = find_files(args.inputs, args.ext, recursive=not args.no_recursive)
+    if not files:
+        print('没有找到要处理的文件', file=sys.stderr)
+        return 1
+
+    # 工作进程在创建时继承或从磁盘缓存读取用户词典
+    userdict.apply()
+    start = time.perf_counter()
+    step = max(1, len(files) // 20)
+
+    def progress(done, total, result):
+        if 'error' in result:
+            print(f'处理失败 {result["file"]}: {result["error"]}', file=sys.stderr)
+        if done % step == 0 or done == total:
+            print(f'已处理 {done}/{total} 个文件（{time.perf_counter() - start:.1f} 秒）', file=sys.stderr)
+
+    written = run(
+        files, args.tasks, args.output,
+        workers=args.workers,
+        fmt=args.format,
+        top_n=args.top,
+        progress=progress,
+        stopwords=(
+            stopword_lists.stopword_set(args.stopword_lists, stopword_lists.parse_words(args.extra_stopwords))
+            if args.remove_stopwords else None
+        ),
+        remove_punctuation=args.remove_punctuation,
+        remove_numbers=args.remove_numbers,
+        backend=args.sentiment_backend,
+        font_path=args.font,
+    )
+    for name, path in written.items():
+        print(f'{name}: {path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,85 +1,78 @@
 import streamlit as st
 import re
-import jieba
-from collections import Counter
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import io
+import uuid
+import segmentation
+import text_stats
+import normalize
+import stopwords
+import exports
+import annotation_store
+import preannotation
 import pandas as pd
 
-def generate_wordcloud(analysis_text):
-    remove_stop_words = st.checkbox('去除停用词', value=False, key='remove_stop_words_checkbox')
-    
+def extract_chinese(text):
+    """提取文本中的全部汉字并拼接为一个字符串（单次替换，不生成中间列表）"""
+    return normalize.extract_cjk(text)
+
+def select_stopwords(key):
+    """
+    选择停用词表并输入自定义停用词
+
+    Args:
+        key: 控件 key 的前缀，同一页面上的多个组件需各不相同
+
+    Returns:
+        停用词 frozenset（相同的选择返回同一个对象）
+    """
+    available = stopwords.list_paths()
+    missing = stopwords.missing_defaults()
+    if missing:
+        st.warning(
+            f"找不到内置停用词表 {', '.join(missing)}（{stopwords.STOPWORDS_DIR}），"
+            "默认不去除任何停用词；可选择其它词表或输入自定义停用词"
+        )
+    names = st.multiselect(
+        '停用词表',
+        list(available),
+        default=[name for name in stopwords.DEFAULT_LISTS if name in available],
+        format_func=stopwords.label,
+        help='可在侧边栏上传自己的停用词表，上传后会列在这里',
+        key=f'{key}_stopword_lists'
+    )
     custom_stop_words = st.text_area(
-        '自定义停用词（使用英文逗号 , 分隔，例如：的,和,etc,and）',
+        '自定义停用词（使用逗号或空格分隔，例如：的,和,etc,and）',
         value='',
-        help='请使用英文逗号(,)分隔每个停用词，支持中英文混合输入',
-        key='custom_stop_words_textarea'
+        help='支持中英文混合输入',
+        key=f'{key}_custom_stopwords'
     )
+    return stopwords.stopword_set(names, stopwords.parse_words(custom_stop_words))
+
+
+def generate_wordcloud(analysis_text):
+    remove_stop_words = st.checkbox('去除停用词', value=False, key='remove_stop_words_checkbox')
+    stop_words = select_stopwords('wordcloud') if remove_stop_words else None
     
     try:
-        # 将文本中的多个空格合并为单个空格
-        text = ' '.join(analysis_text.split())
-        
-        if remove_stop_words:
-            # 更新停用词列表
-            stop_words = set(word.strip() for word in custom_stop_words.split(',') if word.strip())
-            stop_words.update(['我', '你', '他', '她', '它', '我们', '你们', '他们', '她们', '它们', 
-                               '的', '了', '和', '在', '是', '不', '也', '有', '对', '到', '说', 
-                               '看', '很', '都', '这', '那', '什么', '就', '人', '因为', '怎么', 
-                               '一个', '而', '但', '会', '能', '让', '如果', '又', '用', '自己', 
-                               '多', '没', '为', '去', '然后', '这样', '那样', '真的', '所以', 
-                               '其实', '并', '吧', '吗', '呢', '就是', '而且', '或者', '可以', 
-                               '可能', '像', '要', '比如', '从', '更', '这儿', '那儿', '那么','等','如此'])
-            
-            # 分别处理英文和中文
-            english_words = [word for word in re.findall(r'[A-Za-z]+', text) if word.lower() not in stop_words]
-            
-            chinese_text = ''.join(re.findall(r'[\u4e00-\u9fff]+', text))
-            chinese_words = [word for word in jieba.lcut(chinese_text) if word not in stop_words]
-            
-            # 合并中英文词频统计
-            all_words = english_words + chinese_words
-            word_freq = Counter(all_words)
-        else:
-            # 不去除连接词的处理
-            english_words = re.findall(r'[A-Za-z]+', text)
-            chinese_text = ''.join(re.findall(r'[\u4e00-\u9fff]+', text))
-            chinese_words = jieba.lcut(chinese_text)
-            all_words = english_words + chinese_words
-            word_freq = Counter(all_words)
+        # 正则提取本身会跳过空白，无需先复制一份合并空格后的文本
+        text = analysis_text
         
-        # 创建词云图
-        wc = WordCloud(
-            width=1200,
-            height=800,
-            background_color='white',
-            max_words=200,
-            font_path='./static/Hiragino Sans GB.ttc',  # 使用支持中英文的字体
-            random_state=42
-        ).generate_from_frequencies(word_freq)
+        # 分别处理英文和中文，合并中英文词频统计
+        word_freq = text_stats.wordcloud_frequencies(text, stop_words)
         
-        # 显示词云图
-        fig, ax = plt.subplots(figsize=(15, 10))
-        ax.imshow(wc, interpolation='bilinear')
-        ax.axis('off')
-        plt.tight_layout(pad=0)
+        # 创建词云图（相同词频表直接复用缓存的图像）
+        import wordcloud_render  # 只在生成词云图时加载 wordcloud 和字体
+        image = wordcloud_render.render(word_freq)
         
         # 在Streamlit中显示词云图
-        st.pyplot(fig)
-        
-        # 提供下载词云图的选项
-        img = io.BytesIO()
-        plt.savefig(img, format='pdf')
-        img.seek(0)
+        st.image(image, width='stretch')
         
+        # 提供下载词云图的选项（点击时才生成PDF）
         st.download_button(
             label="下载词云图",
-            data=img,
+            data=exports.image_pdf_data(wordcloud_render.frequencies_key(word_freq), image),
             file_name="wordcloud.pdf",
             mime="application/pdf"  # mime参数指定了文件的MIME类型，这里是PDF文件
         )
-        plt.close()
     except Exception as e:
         st.error(f"生成词云图失败: {str(e)}")
         
@@ -93,65 +86,42 @@ def count_word_frequency(analysis_text):
         remove_numbers = st.checkbox('去除数字')
     with col4:
         top_n = st.number_input('显示前N个词', min_value=1, value=20)
-    words = jieba.lcut(analysis_text)
-    
-    if remove_punctuation:
-        words = [w for w in words if not re.match(r'[^\w]', w)]
-        
-    if remove_stopwords:
-        stopwords = ['我', '你', '他', '她', '它', '我们', '你们', '他们', '她们', '它们', 
-                     '的', '了', '和', '在', '是', '不', '也', '有', '对', '到', '说', 
-                     '看', '很', '都', '这', '那', '什么', '就', '人', '因为', '怎么', 
-                     '一个', '而', '但', '会', '能', '让', '如果', '又', '用', '自己', 
-                     '多', '没', '为', '去', '然后', '这样', '那样', '真的', '所以', 
-                     '其实', '并', '吧', '吗', '呢', '就是', '而且', '或者', '可以', 
-                     '可能', '像', '要', '比如', '从', '更', '这儿', '那儿', '那么','等','如此']
-        words = [w for w in words if w not in stopwords]
-    
-    if remove_numbers:
-        words = [w for w in words if not w.isdigit()]
-    
-    word_freq = Counter(words)
-    freq_df = pd.DataFrame.from_dict(word_freq, orient='index', columns=['频次'])
-    freq_df = freq_df.sort_values('频次', ascending=False)
+    word_freq = text_stats.word_frequency(
+        analysis_text,
+        remove_punctuation=remove_punctuation,
+        stopwords=select_stopwords('word_frequency') if remove_stopwords else None,
+        remove_numbers=remove_numbers
+    )
     
     # 只保留前N个
-    freq_df = freq_df.head(top_n)
+    top = text_stats.top_words(word_freq, top_n)
+    freq_df = pd.DataFrame({'频次': [count for _, count in top]}, index=[word for word, _ in top])
     
     st.write('词频统计结果:')
     st.dataframe(freq_df)
     
     # 导出词频统计结果
-    csv = freq_df.to_csv(encoding='utf-8-sig').encode('utf-8-sig')
     st.download_button(
         label="下载词频统计结果", 
-        data=csv,
+        data=exports.csv_data(freq_df, index=True),
         file_name="word_frequency.csv",
         mime="text/csv"
     )
     
     
 def count_characters(analysis_text):
-    # 1. 总字符数（不包括空格和换行符）
-    char_count_no_space = len([c for c in analysis_text if not c.isspace()])
-    
-    # 2. 有效字符数（不包括空格、换行符和标点符号）
-    valid_chars = len([c for c in analysis_text if c.isalnum() or '\u4e00' <= c <= '\u9fff'])
-    
-    # 3. 分类统计
-    chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', analysis_text))
-    english_chars = len(re.findall(r'[a-zA-Z]', analysis_text))
-    numbers = len(re.findall(r'\d', analysis_text))
-    spaces = len(re.findall(r'\s', analysis_text))
-    punctuation = len([c for c in analysis_text if re.match(r'[^\w\s]', c)])
-    
-    # 4. 词数统计
-    # 英文词数
-    english_words = len([word for word in analysis_text.split() if re.match(r'[a-zA-Z]+', word)])
-    # 中文词数（使用jieba分词）
-    chinese_text = ''.join(re.findall(r'[\u4e00-\u9fff]+', analysis_text))
-    chinese_words = len(jieba.lcut(chinese_text))
-    total_words = english_words + chinese_words
+    # 一次遍历完成全部字符分类统计
+    stats = text_stats.character_stats(analysis_text)
+    char_count_no_space = stats['no_space']
+    valid_chars = stats['valid']
+    chinese_chars = stats['chinese_chars']
+    english_chars = stats['english_chars']
+    numbers = stats['numbers']
+    spaces = stats['spaces']
+    punctuation = stats['punctuation']
+    english_words = stats['english_words']
+    chinese_words = stats['chinese_words']
+    total_words = stats['total_words']
     
     # 显示统计结果
     st.write("### 字符统计")
@@ -187,10 +157,9 @@ def count_characters(analysis_text):
         '英文词数': english_words
     }
     stats_df = pd.DataFrame([stats_dict])
-    csv = stats_df.to_csv(index=False, encoding='utf-8-sig').encode('utf-8-sig')
     st.download_button(
         label="下载统计结果",
-        data=csv,
+        data=exports.csv_data(stats_df),
         file_name="text_statistics.csv",
         mime="text/csv"
     )
@@ -199,31 +168,30 @@ def split_words(analysis_text):
     st.subheader('分词结果')
     
     try:
-        # 将文本中的多个空格合并为单个空格
-        text = ' '.join(analysis_text.split())
+        text = analysis_text
         
         # 分别处理英文和中文
         # 英文：按空格分词，保留标点
-        english_pattern = r'[A-Za-z]+(?:\'[A-Za-z]+)*|[.,!?;]'
-        english_words = re.findall(english_pattern, text)
+        english_words = normalize.ENGLISH_TOKEN.findall(text)
         
         # 中文：使用jieba分词
-        chinese_text = ''.join(re.findall(r'[\u4e00-\u9fff]+', text))
-        chinese_words = jieba.lcut(chinese_text)
+        chinese_text = extract_chinese(text)
+        chinese_words = segmentation.lcut(chinese_text)
         
         # 合并结果
         all_words = english_words + chinese_words
         
+        result_str = ' '.join(all_words)
+        
         # 显示分词结果
         st.text_area(
             '分词结果（词语间以空格分隔）：',
-            value=' '.join(all_words),
+            value=result_str,
             height=200,
             key='split_words_result'
         )
         
         # 提供下载选项
-        result_str = ' '.join(all_words)
         st.download_button(
             label="下载分词结果",
             data=result_str.encode('utf-8'),
@@ -234,6 +202,150 @@ def split_words(analysis_text):
     except Exception as e:
         st.error(f"分词失败: {str(e)}")
 
+def _tokenize_sentence(sentence):
+    """
+    标注用的句子分词：英文单词保持完整，中文使用jieba分词
+    
+    Returns:
+        [(词序号, 词语), ...]，只包含非空词语
+    """
+    words = []
+    # 使用正则表达式找出所有英文单词和其他字符
+    # 驼峰命名、连续大写字母和字母数字组合先拆开
+    for word in normalize.LATIN_OR_CJK_RUN.findall(normalize.normalize(sentence, 'split_camel')):
+        if word.isascii():  # 英文单词
+            words.append(word)
+        else:  # 中文字符
+            words.extend(segmentation.cut(word))
+    return [(j, word) for j, word in enumerate(words) if word.strip()]
+
+def _annotation_owner():
+    """
+    当前标注者的标识：已登录时使用账号邮箱，否则使用保存在页面地址参数中的匿名ID
+    
+    匿名ID写入地址栏，刷新页面或收藏该地址后仍能看到自己的标注项目。
+    """
+    user = st.user
+    if user.get('is_logged_in') and user.get('email'):
+        return user['email']
+    if 'annotator' not in st.query_params:
+        st.query_params['annotator'] = uuid.uuid4().hex
+    return 'anonymous:' + st.query_params['annotator']
+
+def _annotation_document(text):
+    """
+    分句并对每个句子分词，结果按文本内容保存在session_state中
+    
+    文档以标注者和文本哈希为ID登记到标注库（annotation_store）：已登记的文档直接读取
+    保存的分句分词结果和标注，不再重新计算；文档变化时切换到新文档的标注，
+    没有任何标注的旧文档（例如只是切换了预处理选项）随之删除。
+    
+    Returns:
+        {'key': 文档ID, 'sentences': [句子, ...], 'tokens': [[(词序号, 词语), ...], ...]}
+    """
+    owner = _annotation_owner()
+    doc_id = annotation_store.document_id(owner, text)
+    doc = st.session_state.get('annotation_doc')
+    if doc is None or doc['key'] != doc_id:
+        store = annotation_store.get_store()
+        if doc is not None:
+            store.delete_if_unannotated(doc['key'])
+        doc = store.load_document(doc_id)
+        if doc is None:
+            sentences = normalize.split_sentences(text)
+            doc = {
+                'sentences': sentences,
+                'tokens': [_tokenize_sentence(sentence) for sentence in sentences],
+            }
+            store.save_document(doc_id, text, doc['sentences'], doc['tokens'], owner)
+        doc['key'] = doc_id
+        st.session_state.annotation_doc = doc
+        _restore_annotations(doc, store)
+    return doc
+
+def _restore_annotations(doc, store):
+    """从标注库恢复文档的标注结果到session_state"""
+    labels = store.token_labels(doc['key'])
+    st.session_state.annotations = {
+        i: [(word, sentence_labels.get(j, annotation_store.UNLABELED)) for j, word in doc['tokens'][i]]
+        for i, sentence_labels in labels.items()
+    }
+    st.session_state.classifications = {
+        i: {'text': doc['sentences'][i], 'category': category}
+        for i, category in store.sentence_categories(doc['key']).items()
+    }
+
+def _apply_preannotation(doc, text, label_type, labels):
+    """
+    使用jieba词性标注为整篇文档生成预标注，只填充尚未标注的词语
+    
+    Returns:
+        写入的词语数
+    """
+    store = annotation_store.get_store()
+    result = preannotation.preannotate(text, doc['tokens'], label_type, labels)
+    filled = store.fill_token_labels(doc['key'], result)
+    # 清除已创建的标注控件状态，让控件按新的标注结果重新初始化
+    for i, tokens in enumerate(doc['tokens']):
+        for j, word in tokens:
+            st.session_state.pop(f"annotation_seq_{i}_{j}_{word}", None)
+    _restore_annotations(doc, store)
+    return filled
+
+def _save_token_label(doc_id, sentence_id, token_idx, widget_key):
+    # 标签变化时只更新对应的一行
+    annotation_store.get_store().set_token_label(doc_id, sentence_id, token_idx, st.session_state[widget_key])
+
+def _save_sentence_category(doc_id, sentence_id, widget_key):
+    annotation_store.get_store().set_sentence_category(doc_id, sentence_id, st.session_state[widget_key])
+
+def _saved_projects():
+    """显示当前标注者已保存的标注项目，可载入其中一个继续标注或删除"""
+    with st.expander("已保存的标注项目"):
+        store = annotation_store.get_store()
+        projects = store.list_documents(_annotation_owner())
+        if projects.empty:
+            st.write("暂无保存的标注项目")
+            return
+        st.dataframe(projects.drop(columns=['doc_id']), hide_index=True)
+        choice = st.selectbox(
+            "选择要继续的项目",
+            projects.index,
+            format_func=lambda i: f"{projects.at[i, 'preview']}（{projects.at[i, 'updated_at']}）",
+            key='annotation_project'
+        )
+        doc_id = projects.at[choice, 'doc_id']
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("载入项目", key='annotation_load_project'):
+                st.session_state.processed_text = store.document_text(doc_id)
+                st.success('已载入，标注结果已恢复')
+        with col2:
+            if st.button("删除项目", key='annotation_delete_project'):
+                store.delete_document(doc_id)
+                doc = st.session_state.get('annotation_doc')
+                if doc is not None and doc['key'] == doc_id:
+                    # 当前文档被删除，下次运行时重新登记
+                    del st.session_state.annotation_doc
+                st.rerun()
+
+def _annotation_page(total, key):
+    """
+    显示分页控件，返回当前页的句子序号范围
+    
+    Args:
+        total: 句子总数
+        key: 控件key前缀
+    """
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox('每页句子数', [10, 20, 50, 100], key=f'{key}_size')
+    page_count = max(1, -(-total // page_size))
+    with col2:
+        page = st.number_input(f'页码（共 {page_count} 页）', min_value=1, max_value=page_count, value=1, key=f'{key}_number')
+    start = (page - 1) * page_size
+    return range(start, min(start + page_size, total))
+
 def text_annotation(text):
     """文本标注功能"""
     if not text:
@@ -254,41 +366,22 @@ def text_annotation(text):
     with col3:
         remove_numbers = st.checkbox('去除数字', key='annotation_remove_num')
     
-    # 更新分词处理
-    def process_text(text):
-        # 先处理英文单词
-        # 在英文单词之间添加空格
-        text = re.sub(r'([a-zA-Z])([A-Z])', r'\1 \2', text)  # 处理驼峰命名
-        text = re.sub(r'([a-zA-Z])(\d)', r'\1 \2', text)     # 处理字母和数字
-        text = re.sub(r'(\d)([a-zA-Z])', r'\1 \2', text)     # 处理数字和字母
-        
-        # 使用jieba分词，但保留英文单词的完整性
-        words = []
-        for segment in text.split():  # 先按空格分割
-            if re.match(r'^[a-zA-Z]+$', segment):  # 如果是纯英文单词
-                words.append(segment)
-            else:  # 对非英文部分使用jieba分词
-                words.extend(jieba.lcut(segment))
-        return words
-
-    # 处理文本
-    if text:
+    # 输入文本变化时重新开始（否则保留预处理或载入的项目文本）
+    if st.session_state.get('annotation_source_text') != text:
+        st.session_state.annotation_source_text = text
         st.session_state.processed_text = text
-        words = process_text(text)
-        st.session_state.words = words
+    
+    _saved_projects()
         
     # 文本预处理
     if st.button("应用预处理", key='apply_preprocessing'):
-        processed_text = text
-        if remove_punctuation:
-            # 保留句号、感叹号、问号等分句标点
-            processed_text = re.sub(r'[^\w\s。！？!?.]', '', processed_text)
-        if remove_spaces:
-            # 合并多个空格为单个空格并移除英文单词之间的空格
-            words = processed_text.split()
-            processed_text = ''.join(words)
-        if remove_numbers:
-            processed_text = re.sub(r'\d+', '', processed_text)
+        # 保留句号、感叹号、问号等分句标点；去除空格时同时移除英文单词之间的空格
+        steps = [step for step, enabled in (
+            ('strip_punct_keep_sentence_end', remove_punctuation),
+            ('strip_digits', remove_numbers),
+            ('remove_spaces', remove_spaces),
+        ) if enabled]
+        processed_text = normalize.normalize(text, *steps)
         
         # 保存处理后的文本
         st.session_state.processed_text = processed_text
@@ -298,10 +391,9 @@ def text_annotation(text):
     st.write("### 当前文本")
     st.text_area("文本内容：", st.session_state.processed_text, height=100, key='current_text_display')
     
-    # 分句
-    sentences = re.split(r'([。！？.!?])', st.session_state.processed_text)
-    sentences = [''.join(i) for i in zip(sentences[0::2], sentences[1::2] + [''])]
-    sentences = [s.strip() for s in sentences if s.strip()]
+    # 分句与分词（每个文档只计算一次，保存在session_state中）
+    doc = _annotation_document(st.session_state.processed_text)
+    sentences = doc['sentences']
     
     # 使用info显示分句结果
     st.info(f"✂️ 文本已被分割为 {len(sentences)} 个句子")
@@ -368,9 +460,17 @@ def text_annotation(text):
             "输入标注类别（用逗号分隔）：",
             value=default_labels,
             help=help_text,
-            key="annotation_custom_labels"
+            key=f"annotation_custom_labels_{label_type}"  # 每种标注类型各自保留输入，切换类型时显示对应的默认标签
         ).split(',')
         
+        # 词性和命名实体可以用jieba词性标注自动预填
+        if label_type in ("词性", "命名实体"):
+            if st.button("🤖 自动预标注", key='annotation_preannotate',
+                         help="对全文进行jieba词性标注，为尚未标注的词语预填标签，已有的标注不会被覆盖"):
+                with st.spinner('正在预标注...'):
+                    filled = _apply_preannotation(doc, st.session_state.processed_text, label_type, custom_labels)
+                st.success(f'预标注完成，已填充 {filled} 个词语，请检查并修改错误的标签')
+        
         # 显示标注说明
         with st.expander("查看标注说明"):
             if label_type == "命名实体":
@@ -436,70 +536,44 @@ def text_annotation(text):
         if 'annotations' not in st.session_state:
             st.session_state.annotations = {}
         
-        # 显示标注界面
+        # 显示标注界面（只渲染当前页的句子）
         st.write("### 词语标注")
-        for i, sentence in enumerate(sentences):
+        label_options = ["无标注"] + custom_labels
+        for i in _annotation_page(len(sentences), 'annotation_word_page'):
+            sentence = sentences[i]
             col1, col2 = st.columns([3, 1])
             with col1:
                 st.write(f"句子 {i+1}: {sentence}")
             with col2:
-                # 改进的英文分词处理
-                def split_english_words(text):
-                    # 处理驼峰命名
-                    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
-                    # 处理连续的大写字母（如AI、GPU）
-                    text = re.sub(r'([A-Z])([A-Z][a-z])', r'\1 \2', text)
-                    # 处理数字和字母的组合
-                    text = re.sub(r'([a-zA-Z])(\d)', r'\1 \2', text)
-                    text = re.sub(r'(\d)([a-zA-Z])', r'\1 \2', text)
-                    return text
-
-                # 先处理英文
-                processed_sentence = split_english_words(sentence)
-                
-                # 分词处理
-                words = []
-                # 使用正则表达式找出所有英文单词和其他字符
-                pattern = r'[A-Za-z]+|[\u4e00-\u9fff]+'
-                matches = re.finditer(pattern, processed_sentence)
-                
-                for match in matches:
-                    word = match.group()
-                    if re.match(r'^[A-Za-z]+$', word):  # 英文单词
-                        words.append(word)
-                    else:  # 中文字符
-                        words.extend(jieba.lcut(word))
-                
-                # 标注处理
+                # 恢复之前已选择的标签（翻页后控件会重新创建）
+                previous = st.session_state.annotations.get(i)
                 annotations = []
-                for j, word in enumerate(words):
-                    if word.strip():  # 只标注非空词语
-                        unique_key = f"annotation_seq_{i}_{j}_{word}"
-                        label = st.selectbox(
-                            f"'{word}' 的类别",
-                            ["无标注"] + custom_labels,
-                            key=unique_key
-                        )
-                        annotations.append((word, label))
+                for k, (j, word) in enumerate(doc['tokens'][i]):
+                    unique_key = f"annotation_seq_{i}_{j}_{word}"
+                    previous_label = previous[k][1] if previous else "无标注"
+                    # 保存的标签不在当前标签列表中时仍然保留
+                    options = label_options if previous_label in label_options else label_options + [previous_label]
+                    label = st.selectbox(
+                        f"'{word}' 的类别",
+                        options,
+                        index=options.index(previous_label),
+                        key=unique_key,
+                        on_change=_save_token_label,
+                        args=(doc['key'], i, j, unique_key)
+                    )
+                    annotations.append((word, label))
                 st.session_state.annotations[i] = annotations
                 
         # 统计功能
         if st.button('统计标注结果', key='annotation_stats'):
-            total_words = 0
-            labeled_words = 0
-            
-            for sent_id, annotations in st.session_state.annotations.items():
-                for word, label in annotations:
-                    total_words += 1
-                    if label != "无标注":
-                        labeled_words += 1
+            total_words, labeled_words = annotation_store.get_store().label_stats(doc['key'])
             
             st.info(f"""
             📊 标注统计：
                 - 总句数：{len(sentences)}
                 - 总词数：{total_words}
                 - 已标注词数：{labeled_words}
-                - 标注率：{(labeled_words/total_words*100):.1f}%
+                - 标注率：{(labeled_words/max(total_words, 1)*100):.1f}%
             """)
 
     else:  # 句子级标注
@@ -518,15 +592,21 @@ def text_annotation(text):
             
         # 显示分类界面
         st.write("### 句子标注")
-        for i, sentence in enumerate(sentences):
+        for i in _annotation_page(len(sentences), 'annotation_sentence_page'):
+            sentence = sentences[i]
             col1, col2 = st.columns([3, 1])
             with col1:
                 st.write(f"句子 {i+1}: {sentence}")
             with col2:
+                previous = st.session_state.classifications.get(i, {}).get('category')
+                options = custom_categories if previous is None or previous in custom_categories else custom_categories + [previous]
                 category = st.selectbox(
                     "选择句子类别",
-                    custom_categories,
-                    key=f"annotation_cat_{i}"
+                    options,
+                    index=options.index(previous) if previous in options else 0,
+                    key=f"annotation_cat_{i}",
+                    on_change=_save_sentence_category,
+                    args=(doc['key'], i, f"annotation_cat_{i}")
                 )
                 st.session_state.classifications[i] = {
                     'text': sentence,
@@ -534,23 +614,9 @@ def text_annotation(text):
                 }
     
     # 在最外层添加下载功能
-    if st.session_state.annotations:  # 如果有标注数据
-        # 准备数据
-        labeled_results = []
-        all_results = []
-        
-        for sent_id, annotations in st.session_state.annotations.items():
-            sentence = sentences[sent_id]  # 获取原句
-            for word, label in annotations:
-                result = {
-                    'sentence_id': sent_id + 1,
-                    'sentence': sentence,  # 添加原句文本
-                    'word': word,
-                    'label': label
-                }
-                all_results.append(result)
-                if label != "无标注":
-                    labeled_results.append(result)
+    if st.session_state.get('annotations'):  # 如果有标注数据
+        store = annotation_store.get_store()
+        total_words, labeled_words = store.label_stats(doc['key'])
         
         # 选择下载数据类型
         download_type = st.radio(
@@ -559,21 +625,21 @@ def text_annotation(text):
             key="download_type"
         )
         
-        if download_type == "已标注数据" and labeled_results:
-            df = pd.DataFrame(labeled_results)
-            csv = df.to_csv(index=False).encode('utf-8-sig')
+        # 点击下载时才从标注库中导出
+        def annotation_csv(labeled_only):
+            return lambda: store.export_tokens(doc['key'], labeled_only).to_csv(index=False).encode('utf-8-sig')
+        
+        if download_type == "已标注数据" and labeled_words:
             st.download_button(
                 label="下载数据",
-                data=csv,
+                data=annotation_csv(True),
                 file_name="labeled_annotations.csv",
                 mime="text/csv"
             )
-        elif download_type == "全部数据" and all_results:
-            df = pd.DataFrame(all_results)
-            csv = df.to_csv(index=False).encode('utf-8-sig')
+        elif download_type == "全部数据" and total_words:
             st.download_button(
                 label="下载数据",
-                data=csv,
+                data=annotation_csv(False),
                 file_name="all_annotations.csv",
                 mime="text/csv"
             )
@@ -591,13 +657,10 @@ def export_danmu_analysis(df, video_title):
         safe_title = re.sub(r'[\\/*?:"<>|]', "", video_title)
         filename = f"{safe_title}_弹幕分析.csv"
         
-        # 转换为CSV并编码
-        csv_data = df.to_csv(index=False, encoding='utf-8-sig').encode('utf-8-sig')
-        
-        # 提供下载按钮
+        # 提供下载按钮（点击时才生成CSV）
         st.download_button(
             label="📥 下载弹幕分析结果",
-            data=csv_data,
+            data=exports.csv_data(df),
             file_name=filename,
             mime="text/csv",
             help="下载完整的弹幕分析数据"
@@ -0,0 +1,131 @@
+"""
+B站分段弹幕（seg.so）protobuf 解码模块
+
+接口返回 DmSegMobileReply 消息，其中 elems（字段 1）为重复的 DanmakuElem。
+这里直接按 protobuf 编码格式解码所需字段，不依赖 protobuf 库和生成代码。
+
+DanmakuElem 中用到的字段：
+    1 id         int64   弹幕 ID
+    2 progress   int32   出现时间（毫秒）
+    3 mode       int32   模式
+    4 fontsize   int32   字号
+    5 color      uint32  颜色
+    6 midHash    string  发送者哈希
+    7 content    string  内容
+    8 ctime      int64   发送时间戳
+    11 pool      int32   弹幕池
+"""
+from array import array
+
+# protobuf 编码类型
+_VARINT = 0
+_FIXED64 = 1
+_LENGTH_DELIMITED = 2
+_FIXED32 = 5
+
+
+def _read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _iter_fields(data, start=0, end=None):
+    """
+    遍历一条消息中的所有字段
+
+    Yields:
+        (字段号, 编码类型, 值)；长度分隔类型的值为 (起始位置, 结束位置)
+    """
+    pos = start
+    end = len(data) if end is None else end
+    while pos < end:
+        key, pos = _read_varint(data, pos)
+        field, wire_type = key >> 3, key & 0x07
+        if wire_type == _VARINT:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == _LENGTH_DELIMITED:
+            length, pos = _read_varint(data, pos)
+            value = (pos, pos + length)
+            pos += length
+        elif wire_type == _FIXED64:
+            value = int.from_bytes(data[pos:pos + 8], 'little')
+            pos += 8
+        elif wire_type == _FIXED32:
+            value = int.from_bytes(data[pos:pos + 4], 'little')
+            pos += 4
+        else:
+            raise ValueError(f'不支持的 protobuf 编码类型: {wire_type}')
+        yield field, wire_type, value
+
+
+def _signed32(value):
+    # int32 负数按 64 位补码编码
+    value &= 0xFFFFFFFF
+    return value - (1 << 32) if value & 0x80000000 else value
+
+
+def decode_segment(data):
+    """
+    解码一个弹幕分段
+
+    Args:
+        data: seg.so 返回的原始字节
+
+    Returns:
+        与 danmaku_store.build_store 参数顺序一致的各列：
+        (time_seconds, mode, fontsize, color, send_time, pool, user_hash, row_id, text)
+    """
+    time_seconds = array('d')
+    mode = array('b')
+    fontsize = array('h')
+    color = array('i')
+    send_time = array('q')
+    pool = array('b')
+    user_hash = []
+    row_id = array('q')
+    texts = []
+
+    data = memoryview(data)
+    for field, wire_type, value in _iter_fields(data):
+        if field != 1 or wire_type != _LENGTH_DELIMITED:
+            continue
+        # proto3 中未出现的数值字段取默认值 0
+        elem = dict.fromkeys((1, 2, 3, 4, 5, 8, 11), 0)
+        mid_hash = ''
+        content = ''
+        for sub_field, sub_type, sub_value in _iter_fields(data, *value):
+            if sub_type == _LENGTH_DELIMITED:
+                if sub_field == 6:
+                    mid_hash = str(data[sub_value[0]:sub_value[1]], 'utf-8', 'replace')
+                elif sub_field == 7:
+                    content = str(data[sub_value[0]:sub_value[1]], 'utf-8', 'replace')
+            elif sub_field in elem:
+                elem[sub_field] = sub_value
+
+        time_seconds.append(_signed32(elem[2]) / 1000)
+        mode.append(_signed32(elem[3]))
+        fontsize.append(_signed32(elem[4]))
+        color.append(elem[5] & 0xFFFFFF)
+        send_time.append(elem[8])
+        pool.append(_signed32(elem[11]))
+        user_hash.append(mid_hash)
+        row_id.append(elem[1])
+        texts.append(content.strip())
+
+    return time_seconds, mode, fontsize, color, send_time, pool, user_hash, row_id, texts
+
+
+def merge_segments(segments):
+    """按列拼接多个分段的解码结果，返回值格式与 decode_segment 相同"""
+    merged = decode_segment(b'')
+    for segment in segments:
+        for column, values in zip(merged, segment):
+            column.extend(values)
+    return merged
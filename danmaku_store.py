@@ -0,0 +1,120 @@
+"""
+弹幕数据存储模块
+
+弹幕以列式 DataFrame 保存全部属性：数值列使用尽可能小的定长类型，
+取值重复度高的列（模式、字号、颜色、弹幕池、发送者、内容）使用 category 类型，
+内存占用只有逐条 dict 存储方式的一小部分，且可以直接进行向量化分析。
+"""
+import numpy as np
+import pandas as pd
+
+# 弹幕模式
+DANMAKU_MODES = {
+    1: '滚动',
+    4: '底部',
+    5: '顶部',
+    6: '逆向',
+    7: '高级',
+    8: '代码',
+    9: 'BAS',
+}
+
+# 导出时使用的中文列名
+EXPORT_COLUMNS = {
+    'time': '出现时间',
+    'time_seconds': '出现时间(秒)',
+    'text': '弹幕内容',
+    'mode': '模式',
+    'fontsize': '字号',
+    'color': '颜色',
+    'send_time': '发送时间',
+    'pool': '弹幕池',
+    'user_hash': '发送者哈希',
+    'row_id': '弹幕ID',
+    'source': '来源视频',
+    'part': '分P',
+}
+
+
+def build_store(time_seconds, mode, fontsize, color, send_time, pool, user_hash, row_id, text):
+    """
+    由各列数据构建紧凑的弹幕 DataFrame，并按出现时间排序
+
+    Args:
+        time_seconds: 出现时间（秒）
+        mode: 弹幕模式
+        fontsize: 字号
+        color: 十进制 RGB 颜色
+        send_time: 发送时间（Unix 时间戳，秒）
+        pool: 弹幕池
+        user_hash: 发送者 ID 的哈希
+        row_id: 弹幕 ID
+        text: 弹幕内容
+
+    Returns:
+        弹幕 DataFrame
+    """
+    df = pd.DataFrame({
+        'time_seconds': np.asarray(time_seconds, dtype=np.float32),
+        'text': pd.Categorical(text),
+        'mode': pd.Categorical(np.asarray(mode, dtype=np.int8)),
+        'fontsize': pd.Categorical(np.asarray(fontsize, dtype=np.int16)),
+        'color': pd.Categorical(np.asarray(color, dtype=np.int32)),
+        'send_time': np.asarray(send_time, dtype='datetime64[s]'),
+        'pool': pd.Categorical(np.asarray(pool, dtype=np.int8)),
+        'user_hash': pd.Categorical(user_hash),
+        'row_id': np.asarray(row_id, dtype=np.int64),
+    })
+    return df.sort_values('time_seconds', kind='stable').reset_index(drop=True)
+
+
+def concat_stores(stores, labels=None):
+    """
+    合并多个弹幕 DataFrame
+
+    Args:
+        stores: 弹幕 DataFrame 列表
+        labels: 可选，{列名: 与 stores 一一对应的取值列表}，
+            为每个来源添加标记列（如视频编号、分P标题），标记列为 category 类型
+
+    Returns:
+        合并后按出现时间排序的弹幕 DataFrame，category 列的类别取并集
+    """
+    stores = list(stores)
+    if labels:
+        stores = [
+            df.assign(**{column: values[i] for column, values in labels.items()})
+            for i, df in enumerate(stores)
+        ]
+    categorical = [
+        column for column in stores[0].columns
+        if isinstance(stores[0][column].dtype, pd.CategoricalDtype) or column in (labels or {})
+    ]
+    df = pd.concat(stores, ignore_index=True)
+    for column in categorical:
+        df[column] = df[column].astype('category')
+    return df.sort_values('time_seconds', kind='stable').reset_index(drop=True)
+
+
+def format_time(seconds):
+    """把秒数列格式化为 mm:ss"""
+    seconds = pd.Series(seconds).astype('int64')
+    return (seconds // 60).astype(str).str.zfill(2) + ':' + (seconds % 60).astype(str).str.zfill(2)
+
+
+def memory_usage(df):
+    """DataFrame 实际占用的内存（字节，包含字符串对象）"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def export_frame(df):
+    """
+    生成用于展示和导出的弹幕表：添加 mm:ss 时间列，颜色转为十六进制，
+    模式转为中文名称，列名改为中文
+    """
+    out = df.copy()
+    out.insert(0, 'time', format_time(df['time_seconds']).to_numpy())
+    # category 列上的 map 只作用于各个类别，不逐行计算
+    out['mode'] = df['mode'].map(lambda m: DANMAKU_MODES.get(m, str(m)))
+    out['color'] = df['color'].map(lambda c: '#%06X' % c)
+    return out.rename(columns=EXPORT_COLUMNS)
@@ -0,0 +1,105 @@
+"""
+导出模块
+
+下载文件的内容只在用户点击下载按钮时才生成（st.download_button 的 data
+参数传入无参函数），生成结果按内容哈希缓存，重复下载不会重新生成。
+DataFrame 的内容哈希本身也要遍历整个表，同样推迟到点击时才计算。
+Excel 文件直接写入内存中的 BytesIO，不再使用临时文件。
+"""
+import hashlib
+import io
+
+import pandas as pd
+
+from caching import TTLCache, register_cache
+
+_cache = TTLCache(maxsize=32, ttl=600)
+
+
+def frame_key(df, *extra):
+    """由 DataFrame 内容（含索引和列名）及附加参数计算缓存键"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    digest.update(repr((list(df.columns), extra)).encode('utf-8'))
+    return digest.digest()
+
+
+def arrays_key(*arrays):
+    """由若干 NumPy 数组的内容计算缓存键"""
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        digest.update(array.tobytes())
+    return digest.digest()
+
+
+def deferred(key, build):
+    """
+    返回按需生成下载内容的无参函数
+
+    Args:
+        key: 缓存键，或在点击时才计算缓存键的无参函数
+        build: 生成 bytes 的无参函数
+    """
+    def data():
+        return _cache.get_or_compute(key() if callable(key) else key, build)
+    return data
+
+
+def csv_data(df, index=False, transform=None):
+    """
+    按需生成 CSV（UTF-8 BOM 编码，Excel 可直接打开）
+
+    Args:
+        df: 要导出的 DataFrame
+        index: 是否写出索引
+        transform: 可选，导出前对 df 进行转换的函数（同样在点击时才执行）
+    """
+    def build():
+        out = transform(df) if transform else df
+        return out.to_csv(index=index).encode('utf-8-sig')
+    return deferred(lambda: ('csv', frame_key(df, index, transform)), build)
+
+
+def excel_data(df, index=False, transform=None):
+    """按需生成 xlsx 文件，参数同 csv_data"""
+    def build():
+        out = transform(df) if transform else df
+        buffer = io.BytesIO()
+        out.to_excel(buffer, index=index)
+        return buffer.getvalue()
+    return deferred(lambda: ('xlsx', frame_key(df, index, transform)), build)
+
+
+def figure_pdf_data(key, make_figure):
+    """
+    按需把 matplotlib 图形保存为 PDF
+
+    Args:
+        key: 缓存键（通常为绘图数据的哈希）
+        make_figure: 绘制并返回 Figure 的无参函数
+    """
+    def build():
+        import matplotlib.pyplot as plt  # 只在生成 PDF 时加载
+
+        fig = make_figure()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='pdf')
+        plt.close(fig)
+        return buffer.getvalue()
+    return deferred(('figure-pdf', key), build)
+
+
+def image_pdf_data(key, image):
+    """按需把 PIL 图像保存为 PDF"""
+    def build():
+        buffer = io.BytesIO()
+        image.save(buffer, format='PDF')
+        return buffer.getvalue()
+    return deferred(('image-pdf', key), build)
+
+
+def clear_cache():
+    _cache.clear()
+
+
+register_cache('导出文件', _cache.stats, clear_cache)
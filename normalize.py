@@ -0,0 +1,129 @@
+"""
+文本规范化模块
+
+集中定义各页面和分析函数共用的正则表达式（模块加载时编译一次），
+并提供由声明式步骤组成的规范化流水线：
+
+    clean = pipeline('strip_punct', 'strip_digits', 'collapse_spaces')
+    clean(text)
+
+相邻的删除类步骤（删除标点、删除数字等）合并为一个正则，一次替换完成，
+不会为每个步骤各遍历一遍文本。
+"""
+import functools
+import re
+
+# 基本汉字区间
+CJK = '\u4e00-\u9fff'
+
+CJK_RUN = re.compile(f'[{CJK}]+')
+NON_CJK_RUN = re.compile(f'[^{CJK}]+')
+LATIN_WORD = re.compile(r'[A-Za-z]+')
+# 英文单词或连续汉字（标注时的基本单位）
+LATIN_OR_CJK_RUN = re.compile(f'[A-Za-z]+|[{CJK}]+')
+# 英文单词（含撇号缩写，如 don't）及英文标点
+ENGLISH_TOKEN = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)*|[.,!?;]")
+# 以英文字母开头的空白分隔词（用于统计英文单词数）
+ENGLISH_WORD_START = re.compile(r'(?<!\S)[a-zA-Z]')
+# 以非单词字符开头（用于判断分词结果是否为标点）
+NON_WORD = re.compile(r'[^\w]')
+# 分句：句末标点作为分组保留，便于拼回句子
+SENTENCE_END = re.compile(r'([。！？.!?])')
+
+# 驼峰、连续大写和字母数字交界处（四种拆分位置合并为一个零宽匹配）
+_CAMEL_BOUNDARY = re.compile(
+    r'(?<=[a-z])(?=[A-Z])'            # 驼峰命名
+    r'|(?<=[A-Z])(?=[A-Z][a-z])'      # 连续大写字母（如 GPUComputing）
+    r'|(?<=[A-Za-z])(?=\d)'           # 字母与数字
+    r'|(?<=\d)(?=[A-Za-z])'           # 数字与字母
+)
+# 汉字与英文字母/数字交界处
+_SCRIPT_BOUNDARY = re.compile(f'(?<=[{CJK}])(?=[A-Za-z0-9])|(?<=[A-Za-z0-9])(?=[{CJK}])')
+
+
+def _collapse_spaces(text):
+    return ' '.join(text.split())
+
+
+def _remove_spaces(text):
+    return ''.join(text.split())
+
+
+# 删除类步骤：步骤名 -> 要删除的字符的正则
+DELETE_STEPS = {
+    'strip_punct': r'[^\w\s]',
+    'strip_punct_keep_sentence_end': r'[^\w\s。！？!?.]',  # 保留分句标点
+    'strip_digits': r'\d+',
+}
+
+# 其它步骤：步骤名 -> 处理函数
+TRANSFORM_STEPS = {
+    'lowercase': str.lower,
+    'collapse_spaces': _collapse_spaces,
+    'remove_spaces': _remove_spaces,
+    'split_camel': functools.partial(_CAMEL_BOUNDARY.sub, ' '),
+    'split_scripts': functools.partial(_SCRIPT_BOUNDARY.sub, ' '),
+}
+
+
+@functools.lru_cache(maxsize=64)
+def pipeline(*steps):
+    """
+    按步骤名构建规范化函数（相同的步骤组合只编译一次）
+
+    Args:
+        *steps: DELETE_STEPS 或 TRANSFORM_STEPS 中的步骤名，按给出的顺序执行
+
+    Returns:
+        接受文本、返回处理后文本的函数
+    """
+    ops = []
+    pending = []
+
+    def flush():
+        if pending:
+            ops.append(functools.partial(re.compile('|'.join(pending)).sub, ''))
+            pending.clear()
+
+    for step in steps:
+        if step in DELETE_STEPS:
+            pending.append(DELETE_STEPS[step])
+        elif step in TRANSFORM_STEPS:
+            flush()
+            ops.append(TRANSFORM_STEPS[step])
+        else:
+            raise ValueError(f'未知的规范化步骤: {step}')
+    flush()
+
+    def run(text):
+        for op in ops:
+            text = op(text)
+        return text
+    return run
+
+
+def normalize(text, *steps):
+    """按步骤名处理文本，等价于 pipeline(*steps)(text)"""
+    return pipeline(*steps)(text)
+
+
+def extract_cjk(text):
+    """提取文本中的全部汉字并拼接为一个字符串"""
+    return NON_CJK_RUN.sub('', text)
+
+
+def latin_words(text):
+    """文本中的全部英文单词"""
+    return LATIN_WORD.findall(text)
+
+
+def split_sentences(text):
+    """
+    按句末标点分句，标点保留在句尾
+
+    Returns:
+        去除首尾空白后的非空句子列表
+    """
+    parts = SENTENCE_END.split(text)
+    sentences = (''.join(pair) for pair in zip(parts[0::2], parts[1::2] + ['']))
+    return [s.strip() for s in sentences if s.strip()]
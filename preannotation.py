@@ -0,0 +1,130 @@
+"""
+预标注模块
+
+对整篇文档运行一次 jieba.posseg（长文本多进程并行，见 segmentation.pos_cut），
+把词性标记映射为当前的标注类别，作为词语级标注的初始值，标注人员只需修改错误的标签。
+
+标注界面的分词（英文单词保持完整、中文按句分词）与整篇文档的词性标注结果不一定完全一致，
+这里按字符位置对齐两组词语：标注界面的词语都是原文中按顺序出现的子串，
+在词性标注结果中起止位置和内容都相同的词语取其词性，对不上的词语保持未标注。
+按位置对齐不受中间连续的标点、数字等词语数量影响。
+"""
+import segmentation
+
+# 其余标记（标点、成语、习用语等）在词性标注中归入该类别
+FALLBACK_LABEL = '其他'
+
+# 词性标注：jieba 词性标记（先按完整标记，再按首字母查找）-> 标签
+POS_LABELS = {
+    'eng': FALLBACK_LABEL,  # 英文，避免按首字母归入叹词
+    'n': '名词',   # 含 nr、ns、nt、nz 等专有名词
+    't': '名词',   # 时间词
+    's': '名词',   # 处所词
+    'f': '名词',   # 方位词
+    'v': '动词',
+    'a': '形容词',
+    'b': '形容词',  # 区别词
+    'z': '形容词',  # 状态词
+    'd': '副词',
+    'r': '代词',
+    'p': '介词',
+    'c': '连词',
+    'u': '助词',
+    'e': '叹词',
+    'y': '助词',   # 语气词
+    'o': '叹词',   # 拟声词
+    'm': '数词',
+    'q': '量词',
+}
+
+# 命名实体：jieba 词性标记 -> 标签，未列出的标记不是实体
+NER_LABELS = {
+    'nr': '人名',
+    'nrt': '人名',
+    'nrfg': '人名',
+    'ns': '地名',
+    'nt': '组织名',
+    'nz': '其他',
+    't': '时间',
+    'm': '数量',
+    'mq': '数量',
+}
+
+def map_flag(flag, label_type, labels):
+    """
+    把 jieba 词性标记映射为标注类别
+
+    Args:
+        flag: jieba 词性标记
+        label_type: '词性' 或 '命名实体'
+        labels: 当前可选的标注类别
+
+    Returns:
+        labels 中的类别；映射到的类别不在 labels 中时返回 None（保持未标注）
+    """
+    if label_type == '词性':
+        label = POS_LABELS.get(flag) or POS_LABELS.get(flag[:1], FALLBACK_LABEL)
+    elif label_type == '命名实体':
+        label = NER_LABELS.get(flag)
+    else:
+        return None
+    return label if label in labels else None
+
+
+def align_flags(tokens, tagged):
+    """
+    把整篇文档的词性标注结果对齐到标注界面的分词结果
+
+    Args:
+        tokens: [[(词序号, 词语), ...], ...]，每个句子一组
+        tagged: pos_cut 的结果 ((词语, 词性), ...)
+
+    Returns:
+        {(句子序号, 词序号): 词性标记}，对不上的词语不出现在结果中
+    """
+    # 词性标注结果拼接起来就是原文，记录每个词语在原文中的起始位置
+    starts = {}
+    offset = 0
+    for word, flag in tagged:
+        starts[offset] = (word, flag)
+        offset += len(word)
+    text = ''.join(word for word, _ in tagged)
+
+    flags = {}
+    cursor = 0
+    for i, sentence_tokens in enumerate(tokens):
+        for j, word in sentence_tokens:
+            start = text.find(word, cursor)
+            if start < 0:
+                continue
+            cursor = start + len(word)
+            match = starts.get(start)
+            if match is not None and match[0] == word:
+                flags[(i, j)] = match[1]
+            elif word.isascii() and word.isalpha():
+                # 英文单词被驼峰拆分后不会出现在词性标注结果中
+                flags[(i, j)] = 'eng'
+    return flags
+
+
+def preannotate(text, tokens, label_type, labels, parallel=None):
+    """
+    生成预标注结果
+
+    Args:
+        text: 文档全文
+        tokens: 标注界面的分词结果，[[(词序号, 词语), ...], ...]
+        label_type: '词性' 或 '命名实体'
+        labels: 当前可选的标注类别
+        parallel: 是否多进程标注，为 None 时按文本长度自动决定
+
+    Returns:
+        {(句子序号, 词序号): 标签}
+    """
+    flags = align_flags(tokens, segmentation.pos_cut(text, parallel))
+    result = {}
+    for position, flag in flags.items():
+        label = map_flag(flag, label_type, labels)
+        if label is not None:
+            result[position] = label
+    return result
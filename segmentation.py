@@ -0,0 +1,446 @@
+"""
+分词模块
+
+所有分析功能共用的分词层。分词结果按文本内容的哈希值缓存，
+同一段文本在词频统计、字符统计、词云图等多个组件之间，
+以及 Streamlit 每次重新运行脚本时，都只会被 jieba 分词一次。
+
+超过 PARALLEL_THRESHOLD 个字符的长文本会在换行和句末标点处切块，
+分发到进程池中并行分词，再按原顺序合并结果。
+
+pos_cut 使用 jieba.posseg 进行词性标注，缓存和并行方式与 cut 相同。
+
+cut 可以传入停用词集合（见 stopwords），在 jieba 逐词产出时直接丢弃停用词，
+不先生成完整的分词列表再过滤。
+
+用户词典（见 userdict）通过 load_dictionaries 加载：合并后的前缀词典按词典版本
+序列化到磁盘，同一组词典之后直接读取缓存，不再逐条添加词语。
+分词缓存键包含当前词典版本，更换词典后不会取到旧词典的分词结果。
+"""
+import functools
+import hashlib
+import marshal
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import jieba
+import jieba.posseg
+
+from caching import register_cache
+
+# 分词缓存的内存上限（估算字节数），超出后按最近最少使用的顺序淘汰
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# 文本长度（字符数）达到该阈值时才启用多进程分词，短文本在当前进程内完成
+PARALLEL_THRESHOLD = 1_000_000
+# 多进程分词时每个文本块的目标大小（字符数）
+PARALLEL_CHUNK_SIZE = 256 * 1024
+# 分词进程数
+PARALLEL_WORKERS = os.cpu_count() or 1
+
+# 合并了用户词典的前缀词典缓存目录
+DICT_CACHE_DIR = os.environ.get('JIEBA_CACHE_DIR', './data/jieba_cache')
+
+# 切块位置：换行符和中文句末标点之后。
+# 这些字符不属于 jieba 的连续分词区间，在此处切开不会改变分词结果。
+_CHUNK_BOUNDARY = re.compile(r'(?<=[\n。！？])')
+
+
+def _estimate_size(tokens):
+    """估算一组分词结果占用的内存（字节）"""
+    return sys.getsizeof(tokens) + sum(sys.getsizeof(t) for t in tokens)
+
+
+class TokenCache:
+    """
+    以内容哈希为键、按内存占用限制大小的 LRU 缓存
+
+    Args:
+        max_bytes: 缓存允许占用的最大字节数
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key):
+        """查询缓存但不计入命中统计，也不调整淘汰顺序"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[0]
+
+    def put(self, key, tokens):
+        size = _estimate_size(tokens)
+        # 单条结果超过上限时不缓存，避免把其它条目全部挤出
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = (tokens, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """返回缓存的命中/未命中次数、条目数和估算占用"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._size,
+            }
+
+
+_cache = TokenCache()
+_pos_cache = TokenCache()
+
+
+# 当前加载的用户词典：(版本, 缓存文件路径, 词典文件列表, 追加词语)，None 表示只使用默认词典。
+# 缓存文件保存默认词典加上词典文件合并后的结果（没有词典文件时为 None），
+# 追加词语 ((词语, 词频, 词性), ...) 每次加载后再逐条添加，不写入缓存
+_dictionary = None
+_dictionary_lock = threading.Lock()
+
+
+def initialize():
+    """加载 jieba 词典（首次分词时也会自动加载，这里用于启动预热）"""
+    jieba.initialize()
+
+
+def dictionary_version():
+    """当前用户词典的版本，只使用默认词典时为空字符串"""
+    return _dictionary[0] if _dictionary else ''
+
+
+def _load_dictionary_cache(path):
+    """从磁盘缓存读取合并后的前缀词典和词性表，缓存不存在或损坏时返回 False"""
+    try:
+        # 整个文件一次读入再反序列化，比 marshal.load(f) 逐个对象读文件快数倍
+        with open(path, 'rb') as f:
+            freq, total, word_tags = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return False
+    with jieba.dt.lock:
+        jieba.dt.FREQ, jieba.dt.total = freq, total
+        jieba.dt.user_word_tag_tab = {}
+        jieba.dt.initialized = True
+        jieba.posseg.dt.word_tag_tab = word_tags
+    return True
+
+
+def _dump_dictionary_cache(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 先写临时文件再替换，避免其它进程读到写了一半的缓存
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        marshal.dump((jieba.dt.FREQ, jieba.dt.total, jieba.posseg.dt.word_tag_tab), f)
+    os.replace(tmp_path, path)
+
+
+def _build_dictionary(paths):
+    """从默认词典重新开始，依次加载用户词典"""
+    with jieba.dt.lock:
+        jieba.dt.initialized = False
+        jieba.dt.user_word_tag_tab = {}
+        jieba.dt.initialize()
+        # 词性表也从默认词典重新读取，去掉之前加载的用户词典中的词性
+        jieba.posseg.dt.load_word_tag(jieba.dt.get_dict_file())
+        for path in paths:
+            jieba.dt.load_userdict(path)
+        jieba.posseg.dt.makesure_userdict_loaded()
+
+
+def _prune_dictionary_caches(keep):
+    """删除缓存目录中其它版本的词典缓存，只保留 keep"""
+    directory = os.path.dirname(keep)
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith('jieba-') and name.endswith('.cache') and path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # 可能已被其它进程删除
+
+
+def _add_words(words):
+    with jieba.dt.lock:
+        for word, freq, tag in words:
+            jieba.dt.add_word(word, freq, tag)
+
+
+def _activate(dictionary):
+    """切换到指定的用户词典（None 表示默认词典），优先读取磁盘缓存"""
+    if dictionary is None:
+        _build_dictionary([])
+        return
+    version, cache_path, paths, words = dictionary
+    if cache_path is None:
+        _build_dictionary([])
+    elif not _load_dictionary_cache(cache_path):
+        _build_dictionary(paths)
+        try:
+            _dump_dictionary_cache(cache_path)
+            _prune_dictionary_caches(cache_path)
+        except OSError:
+            pass  # 缓存写入失败只影响下次加载速度
+    _add_words(words)
+
+
+def load_dictionaries(paths, version, cache_version=None, words=()):
+    """
+    使用一组用户词典分词
+
+    词典文件不变、只在上次的追加词语后面新增了词语时（例如页面上手动添加词语），
+    直接把新增的词语添加到当前词典，不重新加载。
+
+    Args:
+        paths: 用户词典文件路径列表（jieba 格式：每行 词语 [词频] [词性]）
+        version: 词典文件和追加词语整体的版本（内容哈希），用作分词缓存键；空字符串表示不使用用户词典
+        cache_version: 词典文件的版本，用于磁盘缓存；为 None 时与 version 相同，空字符串表示没有词典文件
+        words: 追加词语 [(词语, 词频, 词性), ...]，词频和词性可以为 None
+
+    Returns:
+        词典是否发生了变化
+    """
+    global _dictionary
+    if cache_version is None:
+        cache_version = version
+    words = tuple(words)
+    with _dictionary_lock:
+        if version == dictionary_version():
+            return False
+        if version:
+            cache_path = os.path.join(DICT_CACHE_DIR, f'jieba-{cache_version}.cache') if cache_version else None
+            dictionary = (version, cache_path, list(paths) if cache_version else [], words)
+        else:
+            dictionary = None
+        current = _dictionary or ('', None, [], ())
+        if dictionary is not None and dictionary[1:3] == current[1:3] and words[:len(current[3])] == current[3]:
+            _add_words(words[len(current[3]):])
+        else:
+            _activate(dictionary)
+        _dictionary = dictionary
+    # 进程池中的进程仍在使用旧词典，下次并行分词时重新创建
+    _reset_pool()
+    return True
+
+
+def text_key(text):
+    """计算文本内容的哈希值，作为缓存键"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def cache_key(text):
+    """分词结果的缓存键：文本哈希加当前词典版本"""
+    return dictionary_version(), text_key(text)
+
+
+def split_chunks(text, chunk_size=PARALLEL_CHUNK_SIZE):
+    """
+    在换行符和句末标点处把文本切成大约 chunk_size 个字符的块
+
+    Args:
+        text: 待切分的文本
+        chunk_size: 每块的目标字符数
+
+    Returns:
+        文本块列表，按顺序拼接后与原文完全相同
+    """
+    chunks = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = start + chunk_size
+        if end >= length:
+            chunks.append(text[start:])
+            break
+        # 从目标位置向后寻找最近的切块位置；找不到时整段作为最后一块
+        match = _CHUNK_BOUNDARY.search(text, end)
+        if match is None:
+            chunks.append(text[start:])
+            break
+        chunks.append(text[start:match.start()])
+        start = match.start()
+    return chunks
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker(dictionary):
+    # fork 方式创建的进程已继承主进程的词典；spawn 方式创建的进程从磁盘缓存读取
+    global _dictionary
+    if dictionary is not None and dictionary_version() != dictionary[0]:
+        _activate(dictionary)
+        _dictionary = dictionary
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PARALLEL_WORKERS, initializer=_init_worker, initargs=(_dictionary,))
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _cut_chunk(chunk, stopwords=None):
+    # 在子进程中执行，返回列表以便序列化回主进程
+    if stopwords is None:
+        return jieba.lcut(chunk)
+    return [w for w in jieba.cut(chunk) if w not in stopwords]
+
+
+def _pos_cut_chunk(chunk):
+    # posseg 返回的 pair 对象转为 (词语, 词性) 元组
+    return [(pair.word, pair.flag) for pair in jieba.posseg.cut(chunk)]
+
+
+def _parallel_map(func, text, chunk_size):
+    """
+    切块后分发到进程池，按原顺序合并结果
+
+    进程池不可用时（例如子进程异常退出）自动退回到当前进程处理。
+    """
+    chunks = split_chunks(text, chunk_size)
+    if len(chunks) < 2 or PARALLEL_WORKERS < 2:
+        return func(text)
+    try:
+        pool = _get_pool()
+        results = []
+        for part in pool.map(func, chunks):
+            results.extend(part)
+        return results
+    except (BrokenProcessPool, OSError):
+        _reset_pool()
+        return func(text)
+
+
+def parallel_lcut(text, chunk_size=PARALLEL_CHUNK_SIZE, stopwords=None):
+    """多进程分词：切块后分发到进程池，按原顺序合并结果"""
+    if stopwords is None:
+        return _parallel_map(_cut_chunk, text, chunk_size)
+    return _parallel_map(functools.partial(_cut_chunk, stopwords=stopwords), text, chunk_size)
+
+
+def _use_parallel(text, parallel):
+    if parallel is None:
+        return len(text) >= PARALLEL_THRESHOLD
+    return parallel
+
+
+def _segment(text, parallel, stopwords=None):
+    if _use_parallel(text, parallel):
+        return parallel_lcut(text, stopwords=stopwords)
+    return _cut_chunk(text, stopwords)
+
+
+def cut(text, parallel=None, stopwords=None):
+    """
+    对文本进行 jieba 分词，结果按内容缓存
+
+    Args:
+        text: 待分词的文本
+        parallel: 是否使用多进程分词；为 None 时按 PARALLEL_THRESHOLD 自动决定
+        stopwords: 可选，停用词 frozenset（如 stopwords.stopword_set 的返回值），
+            分词时直接丢弃其中的词语
+
+    Returns:
+        分词结果组成的元组（不可修改，可在多个调用方之间安全共享）
+    """
+    if not text:
+        return ()
+    key = cache_key(text)
+    if stopwords is not None:
+        # 已有完整分词结果时直接过滤，否则在分词过程中过滤
+        tokens = _cache.peek(key)
+        if tokens is not None:
+            return tuple(w for w in tokens if w not in stopwords)
+        key = (key, stopwords)
+    tokens = _cache.get(key)
+    if tokens is None:
+        tokens = tuple(_segment(text, parallel, stopwords))
+        _cache.put(key, tokens)
+    return tokens
+
+
+def lcut(text, parallel=None):
+    """与 cut 相同，但返回可修改的列表"""
+    return list(cut(text, parallel))
+
+
+def pos_cut(text, parallel=None):
+    """
+    使用 jieba.posseg 进行分词和词性标注，结果按内容缓存
+
+    Args:
+        text: 待标注的文本
+        parallel: 是否使用多进程；为 None 时按 PARALLEL_THRESHOLD 自动决定
+
+    Returns:
+        ((词语, 词性标记), ...) 元组，词性标记采用 jieba 的标记集（n、v、nr、ns ...）
+    """
+    if not text:
+        return ()
+    key = cache_key(text)
+    tagged = _pos_cache.get(key)
+    if tagged is None:
+        if _use_parallel(text, parallel):
+            tagged = tuple(_parallel_map(_pos_cut_chunk, text, PARALLEL_CHUNK_SIZE))
+        else:
+            tagged = tuple(_pos_cut_chunk(text))
+        _pos_cache.put(key, tagged)
+    return tagged
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+def _registered_stats():
+    return {'tokens': _cache.stats(), 'pos': _pos_cache.stats()}
+
+
+def clear_cache():
+    _cache.clear()
+    _pos_cache.clear()
+
+
+register_cache('分词', _registered_stats, clear_cache)
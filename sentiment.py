@@ -0,0 +1,406 @@
+"""
+情感分析模块
+
+对弹幕等短文本批量计算情感值：
+- 先去重，相同文本只计算一次（热门视频中大量重复的“哈哈哈”“233”）；
+- 计算结果按文本缓存在 LRU 缓存中，页面重新运行时直接复用；
+- 未命中缓存的文本较多时，分发到进程池中并行计算。
+
+计算结果以列式 DataFrame（文本列 + float32 情感值列）保存，
+分类、计数、示例和随时间变化的情感曲线都在其上以向量化方式计算。
+
+情感值由可替换的后端计算：
+- snownlp：SnowNLP 朴素贝叶斯模型，较慢；
+- lexicon：基于弹幕网络用语词典的匹配打分，速度快得多，适合海量弹幕。
+新的后端可以通过 register_backend 注册。
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from caching import register_cache
+
+# 缓存的最大条目数
+CACHE_MAX_ENTRIES = 200_000
+# 未命中缓存的文本数达到该阈值时才启用多进程计算
+PARALLEL_THRESHOLD = 2000
+# 情感计算进程数
+PARALLEL_WORKERS = os.cpu_count() or 1
+
+# 情感分类：< 0.4 为消极，0.4 ~ 0.6（含两端）为中性，> 0.6 为积极
+SENTIMENT_LABELS = ['消极', '中性', '积极']
+# 分类在 float64 的原始情感值上进行，避免 0.6 附近的值在转为 float32 后落入错误的类别
+_SENTIMENT_BINS = np.array([0.4, np.nextafter(0.6, 1)])
+
+
+DEFAULT_BACKEND = 'snownlp'
+# 默认的弹幕情感词典
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexicons', 'danmaku_sentiment.txt')
+# 紧挨在情感词前面时使其极性反转的否定词
+NEGATION_CHARS = frozenset('不没别非')
+
+
+class SentimentBackend:
+    """
+    情感计算后端的基类
+
+    子类需设置 name、label 并实现 score。use_pool 为 True 的后端
+    在文本较多时会被分发到进程池中计算。
+    """
+    name = None
+    label = None
+    use_pool = False
+
+    def score(self, text):
+        """返回 0~1 的情感值（越大越积极），无法计算时返回 None"""
+        raise NotImplementedError
+
+
+class SnowNLPBackend(SentimentBackend):
+    name = 'snownlp'
+    label = 'SnowNLP模型（较慢，更细致）'
+    use_pool = True
+
+    def score(self, text):
+        # 直接调用 snownlp.sentiment.classify，
+        # 跳过 SnowNLP 对象构造时为整段文本建立 BM25 索引的开销
+        try:
+            return load_snownlp().classify(text)
+        except Exception:
+            return None
+
+
+def load_snownlp():
+    """
+    导入 snownlp 情感模型
+
+    导入 snownlp.sentiment 时会加载模型文件（约 2~3 秒），因此推迟到第一次使用
+    SnowNLP 后端或启动预热（warmup）时才导入，之后直接从 sys.modules 取得。
+    """
+    from snownlp import sentiment as snow_sentiment
+    return snow_sentiment
+
+
+def load_lexicon(path):
+    """
+    读取情感词典文件
+
+    每行一个词和权重，以空白分隔；正数为积极，负数为消极。
+    空行和以 # 开头的行会被忽略。
+
+    Returns:
+        {词语: 权重}
+    """
+    lexicon = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            word, weight = line.rsplit(None, 1)
+            lexicon[word.lower()] = float(weight)
+    return lexicon
+
+
+def _trie_pattern(words):
+    """
+    把词语集合编译为前缀树结构的正则表达式
+
+    共享前缀只出现一次，每个节点先尝试更长的分支，实现最长匹配，
+    匹配过程完全在正则引擎内完成。
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            body = '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class LexiconBackend(SentimentBackend):
+    """
+    基于词典的快速情感打分
+
+    在文本中查找词典中的词语，累加权重后映射到 0~1：
+    总分为 0 时为 0.5（中性），总分 ±1 对应 0.75 / 0.25。
+
+    Args:
+        lexicon: {词语: 权重}；为 None 时读取 path 指定的词典文件
+        path: 词典文件路径
+    """
+    name = 'lexicon'
+    label = '弹幕词典（快速）'
+
+    def __init__(self, lexicon=None, path=DEFAULT_LEXICON_PATH):
+        if lexicon is None:
+            lexicon = load_lexicon(path)
+        self.lexicon = {word.lower(): weight for word, weight in lexicon.items()}
+        self._pattern = re.compile(_trie_pattern(self.lexicon)) if self.lexicon else None
+
+    def score(self, text):
+        if self._pattern is None:
+            return 0.5
+        text = text.lower()
+        total = 0.0
+        for match in self._pattern.finditer(text):
+            weight = self.lexicon[match.group()]
+            start = match.start()
+            if start and text[start - 1] in NEGATION_CHARS:
+                weight = -weight
+            total += weight
+        return 0.5 + 0.5 * total / (abs(total) + 1)
+
+
+_backends = {}
+
+
+def register_backend(backend):
+    """注册情感计算后端（同名后端会被替换）"""
+    _backends[backend.name] = backend
+    _caches.pop(backend.name, None)
+
+
+def get_backend(name=DEFAULT_BACKEND):
+    """按名称获取后端"""
+    return _backends[name]
+
+
+def available_backends():
+    """返回 {名称: 显示名称}"""
+    return {name: backend.label for name, backend in _backends.items()}
+
+
+def score_text(text, backend=DEFAULT_BACKEND):
+    """计算单条文本的情感值（0~1，越大越积极），失败时返回 None"""
+    return get_backend(backend).score(text)
+
+
+def _score_batch(backend, texts):
+    # 在子进程中执行
+    scorer = get_backend(backend)
+    return [scorer.score(text) for text in texts]
+
+
+class ScoreCache:
+    """
+    按文本缓存情感值的 LRU 缓存
+
+    Args:
+        max_entries: 最大条目数
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, texts):
+        """
+        批量查询缓存
+
+        Returns:
+            (已缓存的 {文本: 情感值}, 未缓存的文本列表)
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for text in texts:
+                if text in self._entries:
+                    self._entries.move_to_end(text)
+                    found[text] = self._entries[text]
+                else:
+                    missing.append(text)
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def update(self, scores):
+        with self._lock:
+            for text, score in scores.items():
+                self._entries[text] = score
+                self._entries.move_to_end(text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+            }
+
+
+# 每个后端各自一份缓存：{后端名称: ScoreCache}
+_caches = {}
+
+
+def _get_cache(backend):
+    cache = _caches.get(backend)
+    if cache is None:
+        cache = _caches.setdefault(backend, ScoreCache(CACHE_MAX_ENTRIES))
+    return cache
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PARALLEL_WORKERS)
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _compute(texts, backend, parallel):
+    """计算一组（已去重的）文本的情感值，返回 {文本: 情感值}"""
+    scorer = get_backend(backend)
+    if parallel is None:
+        parallel = len(texts) >= PARALLEL_THRESHOLD
+    if parallel and scorer.use_pool and PARALLEL_WORKERS > 1:
+        # 每个进程一次处理一批，减少进程间通信次数
+        batch_size = max(1, len(texts) // (PARALLEL_WORKERS * 4))
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        try:
+            scores = []
+            for part in _get_pool().map(_score_batch, [backend] * len(batches), batches):
+                scores.extend(part)
+            return dict(zip(texts, scores))
+        except (BrokenProcessPool, OSError):
+            _reset_pool()
+    return {text: scorer.score(text) for text in texts}
+
+
+def score_texts(texts, backend=DEFAULT_BACKEND, parallel=None):
+    """
+    批量计算情感值
+
+    Args:
+        texts: 文本列表
+        backend: 情感计算后端名称，见 available_backends
+        parallel: 是否使用多进程；为 None 时按 PARALLEL_THRESHOLD 自动决定
+
+    Returns:
+        与 texts 一一对应的情感值列表，无法计算的文本对应 None
+    """
+    cache = _get_cache(backend)
+    unique = list(dict.fromkeys(texts))
+    scores, missing = cache.lookup(unique)
+    if missing:
+        computed = _compute(missing, backend, parallel)
+        cache.update(computed)
+        scores.update(computed)
+    return [scores[text] for text in texts]
+
+
+def sentiment_frame(texts, scores, times=None):
+    """
+    把情感计算结果整理为列式 DataFrame，并完成情感分类
+
+    Args:
+        texts: 文本列表
+        scores: 与 texts 对应的情感值列表（None 表示无法计算，会被丢弃）
+        times: 可选，与 texts 对应的弹幕出现时间（秒）
+
+    Returns:
+        包含 text、sentiment（float32）、category（分类）列的 DataFrame，
+        传入 times 时另有 time_seconds 列
+    """
+    values = np.array([np.nan if s is None else s for s in scores], dtype=np.float64)
+    df = pd.DataFrame({'text': texts, 'sentiment': values})
+    if times is not None:
+        df['time_seconds'] = np.asarray(times, dtype=np.float64)
+    keep = ~np.isnan(values)
+    df = df[keep].reset_index(drop=True)
+    codes = np.digitize(values[keep], _SENTIMENT_BINS)
+    # 先按 float64 分类，再以 float32 保存情感值
+    df['sentiment'] = values[keep].astype(np.float32)
+    df['category'] = pd.Categorical.from_codes(codes, categories=SENTIMENT_LABELS)
+    return df
+
+
+def category_counts(df):
+    """各情感类别的弹幕数量，按 积极、中性、消极 排列"""
+    return df['category'].value_counts().reindex(SENTIMENT_LABELS[::-1], fill_value=0).rename_axis(None)
+
+
+def category_examples(df, n):
+    """
+    每个情感类别的前 n 条弹幕
+
+    Returns:
+        {类别: [文本, ...]}
+    """
+    head = df.groupby('category', observed=False, sort=False).head(n)
+    return {
+        label: head.loc[head['category'] == label, 'text'].tolist()
+        for label in SENTIMENT_LABELS
+    }
+
+
+def sentiment_curve(df, bin_seconds=30):
+    """
+    按视频时间分段统计情感变化
+
+    Args:
+        df: sentiment_frame 返回的 DataFrame（需包含 time_seconds 列）
+        bin_seconds: 每段的秒数
+
+    Returns:
+        以分段起始秒数为索引，包含平均情感值和各类别数量的 DataFrame
+    """
+    bins = (df['time_seconds'].to_numpy() // bin_seconds * bin_seconds).astype(np.int64)
+    grouped = df.groupby(bins)
+    curve = grouped['sentiment'].mean().to_frame('平均情感值')
+    counts = pd.crosstab(bins, df['category']).reindex(columns=SENTIMENT_LABELS, fill_value=0)
+    curve = curve.join(counts)
+    curve.index.name = '时间(秒)'
+    return curve
+
+
+def cache_stats():
+    """返回 {后端名称: 缓存统计}"""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+def clear_cache():
+    for cache in _caches.values():
+        cache.clear()
+
+
+register_backend(SnowNLPBackend())
+register_backend(LexiconBackend())
+
+register_cache('情感分析', cache_stats, clear_cache)
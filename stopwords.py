@@ -0,0 +1,180 @@
+"""
+停用词模块
+
+停用词表分为两类：
+- 标准停用词表：lexicons/stopwords/ 中的 .txt 文件（目前只有内置的 default），
+  以及随依赖安装的英文停用词表（wordcloud）和中文停用词表（SnowNLP）；
+- 用户停用词表：页面上传的停用词表，保存在 USER_STOPWORDS_DIR 目录中。
+
+stopword_set() 把选中的词表和自定义词语合并为 frozenset，相同的组合只构建一次，
+词频统计、词云图、命令行工具等共用同一个集合对象（也便于作为缓存键）。
+词表文件修改后按修改时间自动重新读取。
+"""
+import functools
+import importlib.util
+import os
+import re
+
+import textio
+
+STOPWORDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexicons', 'stopwords')
+USER_STOPWORDS_DIR = os.environ.get('USER_STOPWORDS_DIR', './data/stopwords')
+
+# 未指定词表时使用的标准停用词表
+DEFAULT_LISTS = ('default',)
+
+# 用户停用词表名称的前缀，与标准停用词表区分
+USER_PREFIX = 'user:'
+
+# 随依赖安装的停用词表：名称 -> (包名, 包内相对路径)
+PACKAGE_LISTS = {
+    'english': ('wordcloud', 'stopwords'),
+    'snownlp': ('snownlp', os.path.join('normal', 'stopwords.txt')),
+}
+
+# 页面上显示的词表名称，未列出的词表直接显示名称
+LIST_LABELS = {
+    'default': '常用词（内置）',
+    'english': '英文（wordcloud）',
+    'snownlp': '中文通用（SnowNLP）',
+}
+
+
+def _package_file(package, relative_path):
+    # 只查找包的位置，不导入包本身（wordcloud 导入较慢）
+    spec = importlib.util.find_spec(package)
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    path = os.path.join(list(spec.submodule_search_locations)[0], relative_path)
+    return path if os.path.isfile(path) else None
+
+
+def _txt_files(directory):
+    if not os.path.isdir(directory):
+        return {}
+    return {
+        os.path.splitext(name)[0]: os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.endswith('.txt') and os.path.isfile(os.path.join(directory, name))
+    }
+
+
+def list_paths():
+    """
+    全部可用的停用词表
+
+    Returns:
+        {词表名称: 文件路径}，用户停用词表的名称带 USER_PREFIX 前缀
+    """
+    paths = {}
+    for name, (package, relative_path) in PACKAGE_LISTS.items():
+        path = _package_file(package, relative_path)
+        if path is not None:
+            paths[name] = path
+    paths.update(_txt_files(STOPWORDS_DIR))
+    paths.update({USER_PREFIX + name: path for name, path in _txt_files(USER_STOPWORDS_DIR).items()})
+    return paths
+
+
+def label(name):
+    """词表在页面上显示的名称"""
+    if name.startswith(USER_PREFIX):
+        return f'{name[len(USER_PREFIX):]}（用户）'
+    return LIST_LABELS.get(name, name)
+
+
+@functools.lru_cache(maxsize=32)
+def _read_list(path, mtime):
+    # mtime 只用于区分文件的不同版本
+    with open(path, encoding='utf-8', errors='replace') as f:
+        words = (line.strip() for line in f)
+        return frozenset(word for word in words if word and not word.startswith('#'))
+
+
+def load_list(name):
+    """
+    读取一个停用词表
+
+    Args:
+        name: 词表名称，见 list_paths
+
+    Returns:
+        停用词 frozenset
+    """
+    path = list_paths().get(name)
+    if path is None:
+        raise ValueError(f'未知的停用词表: {name}')
+    return _read_list(path, os.path.getmtime(path))
+
+
+@functools.lru_cache(maxsize=32)
+def _compile(lists, extra):
+    words = set(extra)
+    for words_in_list in lists:
+        words |= words_in_list
+    return frozenset(words)
+
+
+def stopword_set(names=DEFAULT_LISTS, extra=()):
+    """
+    合并停用词表和自定义停用词
+
+    DEFAULT_LISTS 中的内置词表文件缺失时按空词表处理（text_stats 在导入时就会构建默认集合），
+    其它找不到的词表仍然抛出 ValueError。
+
+    Args:
+        names: 词表名称列表
+        extra: 额外的停用词
+
+    Returns:
+        停用词 frozenset，相同的词表和词语组合返回同一个对象
+    """
+    extra = frozenset(word.strip() for word in extra if word.strip())
+    missing = set(missing_defaults())
+    lists = tuple(load_list(name) for name in sorted(set(names)) if name not in missing)
+    return _compile(lists, extra)
+
+
+def missing_defaults():
+    """DEFAULT_LISTS 中找不到文件的内置词表名称"""
+    paths = list_paths()
+    return [name for name in DEFAULT_LISTS if name not in paths]
+
+
+def parse_words(text):
+    """把以英文逗号、中文逗号或空白分隔的停用词拆分为列表"""
+    return [word for word in re.split(r'[,，\s]+', text) if word]
+
+
+def _user_path(name):
+    if name.startswith(USER_PREFIX):
+        name = name[len(USER_PREFIX):]
+    return os.path.join(USER_STOPWORDS_DIR, textio.safe_filename(name))
+
+
+def save_user_list(name, data):
+    """
+    保存上传的用户停用词表（自动检测编码，统一转存为 UTF-8）
+
+    Args:
+        name: 文件名，已存在的同名词表会被覆盖
+        data: 词表文件的字节内容
+
+    Returns:
+        词表名称（带 USER_PREFIX 前缀）
+    """
+    path = _user_path(name)
+    text = textio.decode_bytes(data)
+    os.makedirs(USER_STOPWORDS_DIR, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(''.join(line.strip() + '\n' for line in text.splitlines() if line.strip()))
+    return USER_PREFIX + os.path.splitext(os.path.basename(path))[0]
+
+
+def delete_user_list(name):
+    """删除用户停用词表，返回是否删除了文件"""
+    path = _user_path(name)
+    if os.path.isfile(path):
+        os.remove(path)
+        return True
+    return False
@@ -0,0 +1,79 @@
+"""
+测试公共设施
+
+仓库中的模块都在根目录下，这里把根目录加入 sys.path；
+stub_server 在本地启动一个 HTTP 服务，测试通过各接口的 url_template 参数指向它，不访问 B站。
+"""
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures')
+sys.path.insert(0, ROOT)
+
+
+class StubServer:
+    """
+    按路径返回预设内容的本地 HTTP 服务
+
+    routes: {路径（含查询字符串）: 字节内容或 HTTP 状态码}
+    default: 未设置的路径返回的内容或状态码，默认 404
+    requests: 收到的请求路径，按到达顺序记录
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.default = 404
+        self.requests = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests.append(self.path)
+                body = stub.routes.get(self.path, stub.default)
+                if isinstance(body, int):
+                    self.send_error(body)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self._server.server_address[1]}'
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def count(self, prefix):
+        """以 prefix 开头的请求数"""
+        with self._lock:
+            return sum(1 for path in self.requests if path.startswith(prefix))
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture(autouse=True)
+def _clear_bilibili_cache():
+    # 各测试使用不同的本地端口，但仍清空缓存，避免测试之间相互影响
+    import bilibili
+    bilibili.clear_cache()
+    yield
+    bilibili.clear_cache()
@@ -0,0 +1,74 @@
+"""
+生成 seg/ 中的分段弹幕样例（DmSegMobileReply 的 protobuf 编码）
+
+模拟一个约 22 分钟的视频：第 2 个分段（6~12 分钟）没有弹幕，接口返回空内容。
+修改样例后在仓库根目录运行：
+
+    python tests/fixtures/make_seg_fixtures.py
+"""
+import os
+
+FIXTURES = os.path.dirname(os.path.abspath(__file__))
+
+# 每个分段的弹幕：(弹幕 ID, 出现时间(毫秒), 模式, 字号, 颜色, 发送者哈希, 内容, 发送时间戳, 弹幕池)
+SEGMENTS = {
+    1: [
+        (7001, 5000, 1, 25, 0xFFFFFF, 'a1b2c3d4', '开头打卡', 1700000000, 0),
+        (7002, 300500, 5, 18, 0xFF0000, 'e5f6a7b8', '前方高能', 1700000100, 1),
+    ],
+    2: [],
+    3: [
+        (7003, 800000, 1, 25, 0xFFFFFF, 'a1b2c3d4', '终于有人说话了', 1700000200, 0),
+    ],
+    4: [
+        (7004, 1300000, 4, 25, 0x00FF00, '0badf00d', '完结撒花', 1700000300, 0),
+    ],
+}
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(number, wire_type, payload):
+    key = _varint(number << 3 | wire_type)
+    if wire_type == 2:
+        return key + _varint(len(payload)) + payload
+    return key + _varint(payload)
+
+
+def encode_elem(row_id, progress, mode, fontsize, color, mid_hash, content, ctime, pool):
+    return b''.join([
+        _field(1, 0, row_id),
+        _field(2, 0, progress),
+        _field(3, 0, mode),
+        _field(4, 0, fontsize),
+        _field(5, 0, color),
+        _field(6, 2, mid_hash.encode('utf-8')),
+        _field(7, 2, content.encode('utf-8')),
+        _field(8, 0, ctime),
+        _field(11, 0, pool),
+    ])
+
+
+def encode_segment(elems):
+    return b''.join(_field(1, 2, encode_elem(*elem)) for elem in elems)
+
+
+def main():
+    os.makedirs(os.path.join(FIXTURES, 'seg'), exist_ok=True)
+    for index, elems in SEGMENTS.items():
+        with open(os.path.join(FIXTURES, 'seg', f'{index}.so'), 'wb') as f:
+            f.write(encode_segment(elems))
+
+
+if __name__ == '__main__':
+    main()
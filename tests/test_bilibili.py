@@ -0,0 +1,128 @@
+"""bilibili 模块的接口测试：通过 url_template 指向本地 stub_server，不访问 B站"""
+import os
+
+import pytest
+import requests
+
+import bilibili
+from conftest import FIXTURES
+
+
+def _read(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+def test_fetch_danmaku_parses_and_caches(stub_server):
+    stub_server.routes['/list.so?oid=1001'] = _read('list.xml')
+    template = stub_server.url + '/list.so?oid={cid}'
+
+    df = bilibili.fetch_danmaku('1001', url_template=template)
+    assert df['text'].tolist() == ['哈哈哈哈', '前方高能', '好看']
+    assert df['time_seconds'].tolist() == [3.25, 12.5, 61.0]
+
+    # 页面重新运行时直接使用缓存，不再下载
+    assert bilibili.fetch_danmaku('1001', url_template=template) is df
+    assert stub_server.count('/list.so') == 1
+
+
+def test_danmaku_cache_holds_a_large_batch(stub_server):
+    cids = [str(2000 + i) for i in range(48)]
+    for cid in cids:
+        stub_server.routes[f'/list.so?oid={cid}'] = _read('list.xml')
+    template = stub_server.url + '/list.so?oid={cid}'
+
+    for _ in range(2):
+        for cid in cids:
+            bilibili.fetch_danmaku(cid, url_template=template)
+    # 超过 32 个分P的批量获取在第二轮也不会重新下载
+    assert stub_server.count('/list.so') == len(cids)
+
+
+def test_http_error_is_raised(stub_server):
+    stub_server.routes['/list.so?oid=404'] = 404
+    with pytest.raises(requests.HTTPError):
+        bilibili.fetch_danmaku('404', url_template=stub_server.url + '/list.so?oid={cid}')
+
+
+def test_resolve_targets_reports_failed_urls(stub_server):
+    stub_server.routes['/video/ok'] = b'<script>{"cid":1001,"page":1}</script>'
+    stub_server.routes['/video/nocid'] = b'<html></html>'
+    urls = [stub_server.url + path for path in ('/video/ok', '/video/missing', '/video/nocid')]
+
+    targets, failed = bilibili.resolve_targets(urls)
+    assert [cid for _, _, cid, _ in targets] == ['1001']
+    assert [url for url, _ in failed] == urls[1:]
+    assert '404' in failed[0][1]
+
+
+SEG_TEXTS = ['开头打卡', '前方高能', '终于有人说话了', '完结撒花']
+
+
+def _serve_segments(stub_server, cid):
+    # 超出视频时长的分段与 B站接口一样返回空内容
+    stub_server.default = b''
+    for index in range(1, 5):
+        stub_server.routes[f'/seg.so?oid={cid}&segment_index={index}'] = _read(os.path.join('seg', f'{index}.so'))
+    return stub_server.url + '/seg.so?oid={cid}&segment_index={index}'
+
+
+def test_fetch_segments_with_known_duration(stub_server):
+    template = _serve_segments(stub_server, '3001')
+    df = bilibili.fetch_danmaku_segments('3001', duration=22 * 60, url_template=template)
+    assert df['text'].tolist() == SEG_TEXTS
+    assert df['time_seconds'].tolist() == [5.0, 300.5, 800.0, 1300.0]
+    assert df['row_id'].tolist() == [7001, 7002, 7003, 7004]
+    assert stub_server.count('/seg.so') == 4
+
+
+def test_fetch_segments_probes_past_empty_segment(stub_server):
+    template = _serve_segments(stub_server, '3002')
+    df = bilibili.fetch_danmaku_segments('3002', url_template=template)
+    # 第 2 个分段为空，之后的分段仍然被获取
+    assert df['text'].tolist() == SEG_TEXTS
+    assert stub_server.count('/seg.so') <= 4 + bilibili.MAX_EMPTY_SEGMENTS + bilibili.FETCH_WORKERS
+
+
+def test_fetch_segments_decodes_in_process_pool(stub_server, monkeypatch):
+    monkeypatch.setattr(bilibili, 'DECODE_WORKERS', 2)
+    template = _serve_segments(stub_server, '3003')
+    df = bilibili.fetch_danmaku_segments('3003', duration=22 * 60, url_template=template)
+    assert df['text'].tolist() == SEG_TEXTS
+
+
+def test_fetch_batch_segmented(stub_server):
+    template = _serve_segments(stub_server, '3004')
+    for index in range(1, 5):
+        stub_server.routes[f'/seg.so?oid=3005&segment_index={index}'] = _read(os.path.join('seg', f'{index}.so'))
+
+    targets = [('BV1', 'P1 上', '3004', 22 * 60), ('BV1', 'P2 下', '3005', None)]
+    df = bilibili.fetch_batch(targets, segmented=True, url_template=template)
+    assert len(df) == 2 * len(SEG_TEXTS)
+    assert df.groupby('part', observed=True).size().to_dict() == {'P1 上': 4, 'P2 下': 4}
+
+
+def test_duration_is_looked_up_only_for_segmented_fetch(stub_server, monkeypatch):
+    bvid = 'BV1xx411c7mD'
+    stub_server.routes[f'/video/{bvid}'] = b'<script>{"cid":3006,"page":1}</script>'
+    stub_server.routes['/list.so?oid=3006'] = _read('list.xml')
+    lookups = []
+
+    def fetch_pagelist(bvid):
+        lookups.append(bvid)
+        return [{'cid': '3006', 'page': 1, 'part': '', 'duration': 22 * 60}]
+
+    monkeypatch.setattr(bilibili, 'fetch_pagelist', fetch_pagelist)
+    targets, failed = bilibili.resolve_targets([f'{stub_server.url}/video/{bvid}'])
+    assert targets == [(bvid, 'P1', '3006', None)] and not failed
+
+    # XML 接口不需要时长，不请求分P列表
+    bilibili.fetch_batch(targets, url_template=stub_server.url + '/list.so?oid={cid}')
+    assert lookups == []
+
+    # 分段接口按分P列表中的时长一次请求全部分段，不逐批探测
+    template = _serve_segments(stub_server, '3006')
+    df = bilibili.fetch_batch(targets, segmented=True, url_template=template)
+    assert df['text'].tolist() == SEG_TEXTS
+    assert lookups == [bvid]
+    assert stub_server.count('/seg.so') == 4
@@ -0,0 +1,53 @@
+"""cli 模块测试：输出名称不冲突，工作进程缩小缓存"""
+import os
+
+import pytest
+
+import cli
+import segmentation
+import sentiment
+import text_stats
+
+
+def _write(path, text='今天天气很好\n'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return str(path)
+
+
+def test_find_files_keeps_same_named_files_apart(tmp_path):
+    first = _write(tmp_path / 'a' / 'x.txt')
+    second = _write(tmp_path / 'b' / 'x.txt')
+    other = _write(tmp_path / 'b' / 'y.txt')
+    files = cli.find_files([first, second, other, first])
+    assert [name for _, name in files] == [os.path.join('a', 'x.txt'), os.path.join('b', 'x.txt'), 'y.txt']
+
+
+def test_run_writes_one_output_per_input(tmp_path):
+    files = cli.find_files([_write(tmp_path / 'a' / 'x.txt'), _write(tmp_path / 'b' / 'x.txt', '我们去公园\n')])
+    cli.run(files, {'tokens'}, str(tmp_path / 'out'), workers=1)
+    outputs = sorted(
+        os.path.relpath(os.path.join(root, name), tmp_path / 'out' / 'tokens')
+        for root, _, names in os.walk(tmp_path / 'out' / 'tokens') for name in names
+    )
+    assert outputs == [os.path.join('a', 'x.txt.txt'), os.path.join('b', 'x.txt.txt')]
+
+
+@pytest.fixture
+def restore_limits():
+    saved = (
+        segmentation.PARALLEL_THRESHOLD, sentiment.PARALLEL_THRESHOLD, segmentation._cache.max_bytes,
+        segmentation._pos_cache.max_bytes, text_stats._results.maxsize, sentiment.CACHE_MAX_ENTRIES,
+    )
+    yield
+    (segmentation.PARALLEL_THRESHOLD, sentiment.PARALLEL_THRESHOLD, segmentation._cache.max_bytes,
+     segmentation._pos_cache.max_bytes, text_stats._results.maxsize, sentiment.CACHE_MAX_ENTRIES) = saved
+
+
+def test_worker_initializer_shrinks_caches(restore_limits):
+    cli._init_worker(None)
+    assert segmentation._cache.max_bytes == cli.WORKER_TOKEN_CACHE_BYTES
+    assert segmentation._pos_cache.max_bytes == 0
+    assert text_stats._results.maxsize == cli.WORKER_RESULT_CACHE_SIZE
+    assert sentiment.CACHE_MAX_ENTRIES == 0
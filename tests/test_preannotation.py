@@ -0,0 +1,40 @@
+"""preannotation 模块测试：标注界面的词语按字符位置对齐到词性标注结果"""
+import pytest
+
+import normalize
+import preannotation
+import segmentation
+
+
+def _tokens(text):
+    # 与标注界面相同：只保留英文单词和汉字，汉字部分再分词
+    result = []
+    for sentence in normalize.split_sentences(text):
+        words = []
+        for run in normalize.LATIN_OR_CJK_RUN.findall(normalize.normalize(sentence, 'split_camel')):
+            words.extend([run] if run.isascii() else segmentation.cut(run))
+        result.append(list(enumerate(words)))
+    return result
+
+
+@pytest.mark.parametrize('prefix', [
+    '清单：' + '，'.join(str(i) for i in range(1, 13)) + '。',
+    '等一下' + '！' * 40,
+    '编号 2024-01-01 12:00:00, 3.14159, 42%, ' * 3,
+])
+def test_alignment_survives_long_unmatched_runs(prefix):
+    text = prefix + '北京、中国和上海都是地名。'
+    tokens = _tokens(text)
+    result = preannotation.preannotate(text, tokens, '命名实体', ['地名'], parallel=False)
+    last = len(tokens) - 1
+    labelled = {tokens[last][j][1] for (i, j), label in result.items() if i == last and label == '地名'}
+    assert labelled == {'北京', '中国', '上海'}
+
+
+def test_camel_case_words_fall_back_to_english():
+    text = '我在用camelCase写代码。'
+    tokens = _tokens(text)
+    flags = preannotation.align_flags(tokens, segmentation.pos_cut(text, False))
+    words = dict(tokens[0])
+    assert {words[j] for (_, j), flag in flags.items() if flag == 'eng'} == {'camel', 'Case'}
+    assert flags[(0, 0)] == 'r'
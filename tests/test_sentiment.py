@@ -0,0 +1,28 @@
+"""sentiment 模块测试：情感分类边界在 float64 上判断"""
+import numpy as np
+import pytest
+
+import sentiment
+
+
+@pytest.mark.parametrize('score, category', [
+    (0.0, '消极'),
+    (np.nextafter(0.4, 0), '消极'),
+    (0.4, '中性'),
+    (0.5, '中性'),
+    (0.6, '中性'),
+    # 转为 float32 后会舍入到 0.6 以下，但原始值大于 0.6
+    (np.nextafter(0.6, 1), '积极'),
+    (0.6000000238418579, '积极'),
+    (1.0, '积极'),
+])
+def test_category_boundaries(score, category):
+    df = sentiment.sentiment_frame(['弹幕'], [score])
+    assert df['category'].iloc[0] == category
+    assert df['sentiment'].dtype == np.float32
+
+
+def test_unscored_texts_are_dropped():
+    df = sentiment.sentiment_frame(['a', 'b', 'c'], [0.1, None, 0.9])
+    assert list(df['text']) == ['a', 'c']
+    assert list(df['category']) == ['消极', '积极']
@@ -0,0 +1,18 @@
+"""stopwords 模块测试：内置词表缺失时默认集合为空，未知词表仍然报错"""
+import pytest
+
+import stopwords
+
+
+def test_default_set_is_empty_when_builtin_list_is_missing(tmp_path, monkeypatch):
+    monkeypatch.setattr(stopwords, 'STOPWORDS_DIR', str(tmp_path))
+    assert stopwords.missing_defaults() == list(stopwords.DEFAULT_LISTS)
+    assert stopwords.stopword_set() == frozenset()
+    assert stopwords.stopword_set(extra=['的']) == frozenset({'的'})
+    with pytest.raises(ValueError):
+        stopwords.stopword_set(['nope'])
+
+
+def test_builtin_default_list_is_shipped():
+    assert stopwords.missing_defaults() == []
+    assert '的' in stopwords.stopword_set()
@@ -0,0 +1,72 @@
+"""timeline 模块测试：每秒计数只计算一次，自适应分箱宽度与 numpy 一致"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import timeline
+
+
+@pytest.fixture
+def store():
+    rng = np.random.default_rng(0)
+    times = np.concatenate([rng.exponential(300, 3000), rng.normal(900, 20, 1000).clip(0)])
+    return pd.DataFrame({'time_seconds': times.astype(np.float32)})
+
+
+def test_per_second_counts_is_computed_once_per_store(store):
+    base = timeline.per_second_counts(store)
+    assert base.sum() == len(store)
+    assert timeline.per_second_counts(store) is base
+    assert timeline.per_second_counts(store.copy()) is not base
+
+
+@pytest.mark.parametrize('rule', list(timeline.BIN_RULES))
+def test_bin_width_matches_numpy(store, rule):
+    seconds = np.floor(store['time_seconds'].to_numpy(dtype=np.float64))
+    edges = np.histogram_bin_edges(seconds, bins=rule)
+    expected = max(1, int(round(edges[1] - edges[0])))
+    assert timeline.bin_width(timeline.per_second_counts(store), rule) == expected
+
+
+def test_histogram_and_rate_use_counts(store):
+    base = timeline.per_second_counts(store)
+    edges, counts = timeline.histogram(base, 60)
+    assert counts.sum() == len(store)
+    assert edges[1] - edges[0] == 60
+    assert timeline.comment_rate(base, 30).size == base.size
+
+
+def _frame(times):
+    return pd.DataFrame({'time_seconds': np.asarray(times, dtype=np.float32)})
+
+
+@pytest.mark.parametrize('rule', list(timeline.BIN_RULES))
+def test_zero_length_span(rule):
+    # 全部弹幕落在同一秒：范围为 0，宽度退回 1 秒
+    base = timeline.per_second_counts(_frame([12.1, 12.5, 12.9]))
+    assert timeline.bin_width(base, rule) == 1
+    edges, counts = timeline.histogram(base, 1)
+    assert counts.sum() == 3 and counts[12] == 3
+    assert np.isfinite(timeline.comment_rate(base, 30)).all()
+
+
+@pytest.mark.parametrize('times', [[], [42.0]])
+def test_empty_and_single_comment(times):
+    base = timeline.per_second_counts(_frame(times))
+    for rule in timeline.BIN_RULES:
+        assert timeline.bin_width(base, rule) == 1
+    edges, counts = timeline.histogram(base, 30)
+    assert counts.sum() == len(times)
+    assert edges.size == counts.size + 1
+    assert timeline.find_peaks(timeline.comment_rate(base, 30), k=3) == ([] if not times else [(42, pytest.approx(2.0))])
+
+
+def test_timestamps_on_bin_edges():
+    # 分箱为左闭右开：正好落在边界上的弹幕属于后一个分箱
+    times = [0.0, 59.999, 60.0, 119.5, 120.0, 180.0]
+    base = timeline.per_second_counts(_frame(times))
+    edges, counts = timeline.histogram(base, 60)
+    assert list(edges) == [0, 60, 120, 180, 240]
+    assert list(counts) == [2, 2, 1, 1]
+    expected, _ = np.histogram(np.floor(np.asarray(times, dtype=np.float32)), bins=edges)
+    assert list(counts) == list(expected)
@@ -0,0 +1,60 @@
+"""userdict 模块测试：手动添加的词语增量生效，词典缓存只保留当前版本"""
+import os
+
+import jieba
+import pytest
+
+import segmentation
+import userdict
+
+TEXT = '我们在看鬼畜区的弹幕护体'
+
+
+@pytest.fixture
+def dictionaries(tmp_path, monkeypatch):
+    monkeypatch.setattr(userdict, 'USERDICT_DIR', str(tmp_path / 'userdict'))
+    monkeypatch.setattr(segmentation, 'DICT_CACHE_DIR', str(tmp_path / 'cache'))
+    os.makedirs(userdict.USERDICT_DIR)
+    yield tmp_path
+    # 恢复默认词典，避免影响其它测试
+    segmentation.load_dictionaries([], '')
+
+
+def _word_tags():
+    jieba.posseg.dt.makesure_userdict_loaded()
+    return dict(jieba.posseg.dt.word_tag_tab)
+
+
+def test_add_words_applies_incrementally(dictionaries, monkeypatch):
+    with open(os.path.join(userdict.USERDICT_DIR, 'base.txt'), 'w', encoding='utf-8') as f:
+        f.write('鬼畜区 50 nz\n')
+    userdict.apply()
+    assert '鬼畜区' in jieba.lcut(TEXT)
+
+    def rebuild(paths):
+        raise AssertionError('添加词语不应重建词典')
+
+    with monkeypatch.context() as m:
+        m.setattr(segmentation, '_build_dictionary', rebuild)
+        assert userdict.add_words(['弹幕护体'], tag='nz') == 1
+        assert userdict.apply()
+    assert '弹幕护体' in jieba.lcut(TEXT)
+    incremental = (dict(jieba.dt.FREQ), jieba.dt.total, _word_tags())
+
+    # 从缓存重新加载（spawn 方式创建的工作进程）得到相同的词典
+    segmentation._activate(segmentation._dictionary)
+    assert (dict(jieba.dt.FREQ), jieba.dt.total, _word_tags()) == incremental
+
+
+def test_dump_prunes_other_versions(dictionaries):
+    path = os.path.join(userdict.USERDICT_DIR, 'base.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('鬼畜区 50 nz\n')
+    userdict.apply()
+    first = os.listdir(segmentation.DICT_CACHE_DIR)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('弹幕护体 50 nz\n')
+    userdict.apply()
+    second = os.listdir(segmentation.DICT_CACHE_DIR)
+    assert len(first) == len(second) == 1
+    assert first != second
@@ -0,0 +1,201 @@
+"""
+文本统计模块
+
+不依赖 Streamlit 的统计计算函数，供 common.py 中的页面组件和 cli.py 调用。
+词频、字符统计和词云词频的结果按 文本哈希 + 过滤选项 缓存，
+页面重新运行时直接返回，不再重新遍历文本。
+停用词在分词时直接过滤（segmentation.cut 的 stopwords 参数）。
+"""
+import heapq
+from collections import Counter
+from operator import itemgetter
+
+import normalize
+import segmentation
+from stopwords import stopword_set
+from caching import TTLCache, register_cache
+
+# 词频统计使用的默认停用词（见 stopwords.DEFAULT_LISTS）
+DEFAULT_STOPWORDS = stopword_set()
+
+_results = TTLCache(maxsize=64, ttl=600)
+
+# 基本汉字区间，与 normalize.CJK 保持一致
+_CJK_RANGE = ('\u4e00', '\u9fff')
+
+
+def filter_tokens(tokens, remove_punctuation=False, stopwords=None, remove_numbers=False):
+    """
+    在遍历分词结果的同时过滤词语，不生成中间列表
+
+    Args:
+        tokens: 分词结果（任意可迭代对象）
+        remove_punctuation: 是否去除标点符号
+        stopwords: 需要去除的停用词集合，为 None 时不过滤
+        remove_numbers: 是否去除纯数字
+
+    Yields:
+        通过过滤的词语
+    """
+    is_punct = normalize.NON_WORD.match  # 以非单词字符开头的词视为标点
+    for w in tokens:
+        if remove_punctuation and is_punct(w):
+            continue
+        if stopwords is not None and w in stopwords:
+            continue
+        if remove_numbers and w.isdigit():
+            continue
+        yield w
+
+
+def count_words(text, **filters):
+    """
+    统计一段文本的词频
+
+    Args:
+        text: 文本
+        **filters: 传给 filter_tokens 的过滤选项
+
+    Returns:
+        Counter 词频表（缓存共享的对象，调用方不应原地修改）
+    """
+    stopwords = filters.pop('stopwords', None)
+    if stopwords is not None:
+        stopwords = frozenset(stopwords)
+    key = ('count_words', segmentation.cache_key(text), stopwords, tuple(sorted(filters.items())))
+    return _results.get_or_compute(
+        key, lambda: Counter(filter_tokens(segmentation.cut(text, stopwords=stopwords), **filters))
+    )
+
+
+def merge_counts(counters):
+    """把多个分块的词频表合并为一个"""
+    total = Counter()
+    for counter in counters:
+        total.update(counter)
+    return total
+
+
+def word_frequency(chunks, **filters):
+    """
+    逐块统计词频并合并
+
+    内存占用只与词表大小有关，与文本总词数无关。各块的统计相互独立，
+    也可以在多个进程中分别调用 count_words 后再用 merge_counts 合并。
+
+    Args:
+        chunks: 文本字符串，或产出文本块的可迭代对象（如 textio.iter_text）
+        **filters: 传给 filter_tokens 的过滤选项
+
+    Returns:
+        Counter 词频表
+    """
+    if isinstance(chunks, str):
+        return count_words(chunks, **filters)
+    return merge_counts(count_words(chunk, **filters) for chunk in chunks)
+
+
+def wordcloud_frequencies(text, stopwords=None):
+    """
+    词云图使用的词频：英文单词按正则提取，中文部分提取汉字后分词
+
+    Args:
+        text: 文本
+        stopwords: 需要去除的停用词集合（英文单词按小写比较），为 None 时不过滤
+
+    Returns:
+        Counter 词频表（缓存共享的对象，调用方不应原地修改）
+    """
+    if stopwords is not None:
+        stopwords = frozenset(stopwords)
+
+    def compute():
+        english_words = normalize.latin_words(text)
+        chinese_words = segmentation.cut(normalize.extract_cjk(text), stopwords=stopwords)
+        if stopwords is None:
+            return Counter(english_words) + Counter(chinese_words)
+        counts = Counter(word for word in english_words if word.lower() not in stopwords)
+        counts.update(chinese_words)
+        return counts
+
+    return _results.get_or_compute(('wordcloud', segmentation.cache_key(text), stopwords), compute)
+
+
+def top_words(counter, n):
+    """
+    用堆取出出现次数最多的 n 个词，不对整个词表排序
+
+    Returns:
+        [(词语, 频次), ...]，按频次从高到低排列
+    """
+    return heapq.nlargest(n, counter.items(), key=itemgetter(1))
+
+
+def _classify_char(c):
+    """
+    判断单个字符属于哪些统计类别
+
+    各类别的判断与正则写法等价：\\s 即 isspace，\\d 即 isdecimal，
+    \\w 即 isalnum 或下划线。
+    """
+    is_space = c.isspace()
+    is_cjk = _CJK_RANGE[0] <= c <= _CJK_RANGE[1]
+    is_word = c.isalnum() or c == '_'
+    return (
+        not is_space,                               # 非空白字符
+        c.isalnum() or is_cjk,                      # 有效字符
+        is_cjk,                                     # 中文字符
+        c.isascii() and c.isalpha(),                # 英文字母
+        c.isdecimal(),                              # 数字
+        is_space,                                   # 空白
+        not is_word and not is_space,               # 标点符号
+    )
+
+
+def character_stats(text):
+    """
+    一次遍历统计各类字符数
+
+    先用 Counter 在 C 层一次性得到每个字符的出现次数，
+    再只对出现过的不同字符（通常只有几千个）逐个分类累加。结果按文本内容缓存。
+
+    Returns:
+        包含各项字符统计与词数统计的字典
+    """
+    return dict(_results.get_or_compute(('chars', segmentation.cache_key(text)), lambda: _character_stats(text)))
+
+
+def _character_stats(text):
+    totals = [0] * 7
+    for c, n in Counter(text).items():
+        for i, flag in enumerate(_classify_char(c)):
+            if flag:
+                totals[i] += n
+    no_space, valid, chinese, english, numbers, spaces, punctuation = totals
+
+    english_words = sum(1 for _ in normalize.ENGLISH_WORD_START.finditer(text))
+    chinese_words = len(segmentation.cut(normalize.extract_cjk(text)))
+    return {
+        'total': len(text),
+        'no_space': no_space,
+        'valid': valid,
+        'chinese_chars': chinese,
+        'english_chars': english,
+        'numbers': numbers,
+        'spaces': spaces,
+        'punctuation': punctuation,
+        'english_words': english_words,
+        'chinese_words': chinese_words,
+        'total_words': english_words + chinese_words,
+    }
+
+
+def cache_stats():
+    return _results.stats()
+
+
+def clear_cache():
+    _results.clear()
+
+
+register_cache('文本统计', cache_stats, clear_cache)
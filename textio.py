@@ -0,0 +1,170 @@
+"""
+文本读取模块
+
+以流的方式读取上传的文件：按块读取字节、增量解码，并按行对齐后逐块产出文本，
+避免同时在内存中保留完整的原始字节和解码后的字符串。
+逐块处理的统计（如 text_stats.word_frequency）直接使用 iter_uploaded_text / iter_text_file，
+内存占用与文件大小无关；需要完整文本的分析再使用 read_uploaded_text / read_text_file。
+"""
+import codecs
+import os
+import re
+
+# 每次从文件中读取的字节数
+READ_CHUNK_SIZE = 1024 * 1024
+# 用于判断编码的文件头部字节数
+DETECT_SIZE = 64 * 1024
+
+# 保存上传文件时，文件名只保留字母、数字、汉字、下划线、连字符和点
+_UNSAFE_NAME = re.compile(r'[^\w.-]+')
+
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+def detect_encoding(head):
+    """
+    根据文件头部字节判断编码
+
+    优先识别 BOM；否则尝试按 UTF-8 解码，失败时视为 GB18030（兼容 GBK/GB2312）。
+
+    Args:
+        head: 文件开头的若干字节
+
+    Returns:
+        编码名称
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    try:
+        # final=False：允许头部末尾截断在一个多字节字符中间
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'gb18030'
+
+
+def decode_bytes(data):
+    """
+    解码上传文件的全部字节（自动检测编码，去掉开头的 BOM）
+
+    Args:
+        data: 文件的字节内容
+
+    Returns:
+        解码后的文本，无法解码的字节替换为 U+FFFD
+    """
+    return data.decode(detect_encoding(data[:DETECT_SIZE]), errors='replace').lstrip('\ufeff')
+
+
+def safe_filename(name, suffix='.txt'):
+    """
+    把上传文件名转换为可以安全保存的文件名
+
+    去掉目录部分和开头的点，其余不安全的字符替换为下划线，并补全扩展名。
+
+    Args:
+        name: 原文件名
+        suffix: 要求的扩展名
+
+    Returns:
+        文件名；结果为空时抛出 ValueError
+    """
+    name = _UNSAFE_NAME.sub('_', os.path.basename(name)).lstrip('.')
+    if not name:
+        raise ValueError('文件名无效')
+    return name if name.endswith(suffix) else name + suffix
+
+
+def iter_text(fileobj, chunk_size=READ_CHUNK_SIZE, encoding=None):
+    """
+    逐块读取并解码文件，按行对齐产出文本块
+
+    Args:
+        fileobj: 以二进制方式读取的文件对象（如 Streamlit 的 UploadedFile）
+        chunk_size: 每次读取的字节数
+        encoding: 指定编码；为 None 时自动检测
+
+    Yields:
+        以换行符结尾的文本块（最后一块可能不以换行结尾）
+    """
+    head = fileobj.read(DETECT_SIZE)
+    if encoding is None:
+        encoding = detect_encoding(head)
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+
+    pending = ''
+    data = head
+    while data:
+        pending += decoder.decode(data)
+        # 只产出到最后一个换行符为止，剩余部分与下一块拼接
+        cut = pending.rfind('\n') + 1
+        if cut:
+            yield pending[:cut]
+            pending = pending[cut:]
+        data = fileobj.read(chunk_size)
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def iter_uploaded_text(uploaded_file):
+    """
+    从头逐块读取上传文件的文本
+
+    Args:
+        uploaded_file: st.file_uploader 返回的文件对象
+
+    Yields:
+        以换行符结尾的文本块，见 iter_text
+    """
+    uploaded_file.seek(0)
+    yield from iter_text(uploaded_file)
+
+
+def iter_text_file(path, encoding=None):
+    """
+    逐块读取本地文本文件（自动检测编码），读完后关闭文件
+
+    Args:
+        path: 文件路径
+        encoding: 指定编码；为 None 时自动检测
+
+    Yields:
+        以换行符结尾的文本块，见 iter_text
+    """
+    with open(path, 'rb') as f:
+        yield from iter_text(f, encoding=encoding)
+
+
+def read_uploaded_text(uploaded_file):
+    """
+    读取上传文件的全部文本
+
+    Args:
+        uploaded_file: st.file_uploader 返回的文件对象
+
+    Returns:
+        解码后的文本
+    """
+    uploaded_file.seek(0)
+    return ''.join(iter_text(uploaded_file))
+
+
+def read_text_file(path, encoding=None):
+    """
+    读取本地文本文件的全部内容（自动检测编码）
+
+    Args:
+        path: 文件路径
+        encoding: 指定编码；为 None 时自动检测
+
+    Returns:
+        解码后的文本
+    """
+    with open(path, 'rb') as f:
+        return ''.join(iter_text(f, encoding=encoding))
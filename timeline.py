@@ -0,0 +1,210 @@
+"""
+弹幕时间分布分析模块
+
+先把弹幕出现时间统计为按秒计数的基础数组（每份弹幕表只扫描一次，结果随弹幕表对象缓存），
+不同分辨率的直方图、自适应分箱宽度、滑动窗口弹幕密度和高能时刻检测都在基础数组上计算，
+切换分箱方式或窗口大小时不需要重新遍历弹幕。
+"""
+import threading
+import weakref
+
+import numpy as np
+
+from caching import register_cache
+
+# 自适应分箱规则（与 np.histogram_bin_edges 的同名规则一致，在每秒计数上计算）
+BIN_RULES = {
+    'auto': '自动',
+    'fd': 'Freedman–Diaconis',
+    'sturges': 'Sturges',
+    'sqrt': '平方根',
+    'doane': 'Doane',
+}
+
+# {id(弹幕表): (弹幕表的弱引用, 每秒计数)}，弹幕表被释放时自动移除
+_base_counts = {}
+_base_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _count(times):
+    times = np.asarray(times, dtype=np.float64)
+    if times.size == 0:
+        return np.zeros(1, dtype=np.int64)
+    return np.bincount(np.floor(np.clip(times, 0, None)).astype(np.int64))
+
+
+def _forget(key):
+    with _base_lock:
+        _base_counts.pop(key, None)
+
+
+def per_second_counts(store):
+    """
+    每秒弹幕数（每个弹幕表只计算一次）
+
+    Args:
+        store: 弹幕 DataFrame（需包含 time_seconds 列），通常是 bilibili 缓存中的同一个对象
+
+    Returns:
+        长度为 视频时长+1 的计数数组，第 i 项为 [i, i+1) 秒内的弹幕数（共享对象，调用方不应修改）
+    """
+    key = id(store)
+    with _base_lock:
+        entry = _base_counts.get(key)
+        if entry is not None and entry[0]() is store:
+            _stats['hits'] += 1
+            return entry[1]
+        _stats['misses'] += 1
+    counts = _count(store['time_seconds'].to_numpy())
+    counts.flags.writeable = False
+    with _base_lock:
+        _base_counts[key] = (weakref.ref(store), counts)
+    weakref.finalize(store, _forget, key)
+    return counts
+
+
+def _weighted_percentile(seconds, cumulative, q):
+    # 第 q 百分位所在的秒数（cumulative 为每秒计数的累加和）
+    return seconds[np.searchsorted(cumulative, q / 100 * cumulative[-1], side='left')]
+
+
+def bin_width(base, rule='auto'):
+    """
+    按自适应规则确定分箱宽度（秒，至少为 1）
+
+    与 np.histogram_bin_edges 的规则相同，但直接在每秒计数上计算（按秒取整），不重新遍历弹幕。
+
+    Args:
+        base: per_second_counts 的返回值
+        rule: BIN_RULES 中的规则名
+    """
+    seconds = np.flatnonzero(base)
+    n = int(base.sum())
+    if n < 2 or seconds.size < 2:
+        return 1
+    span = float(seconds[-1] - seconds[0])
+    weights = base[seconds].astype(np.float64)
+
+    sturges = span / (np.log2(n) + 1.0)
+    if rule == 'sqrt':
+        width = span / np.sqrt(n)
+    elif rule == 'sturges':
+        width = sturges
+    elif rule in ('fd', 'auto'):
+        cumulative = np.cumsum(weights)
+        iqr = _weighted_percentile(seconds, cumulative, 75) - _weighted_percentile(seconds, cumulative, 25)
+        fd = 2.0 * iqr * n ** (-1.0 / 3.0)
+        if rule == 'fd':
+            width = fd
+        else:
+            # numpy 的 auto：取两者中较小的宽度，fd 为 0 时使用 sturges
+            width = min(fd, sturges) if fd else sturges
+    elif rule == 'doane':
+        mean = np.average(seconds, weights=weights)
+        std = np.sqrt(np.average((seconds - mean) ** 2, weights=weights))
+        if std == 0:
+            return 1
+        g1 = np.average(((seconds - mean) / std) ** 3, weights=weights)
+        sg1 = np.sqrt(6.0 * (n - 2) / ((n + 1.0) * (n + 3)))
+        width = span / (1.0 + np.log2(n) + np.log2(1.0 + abs(g1) / sg1))
+    else:
+        raise ValueError(f'未知的分箱规则: {rule}')
+    if width <= 0:
+        return 1
+    # 与 numpy 相同：按估计宽度向上取整得到分箱数，再把范围等分
+    return max(1, int(round(span / np.ceil(span / width))))
+
+
+def histogram(base, width):
+    """
+    指定宽度的直方图，由每秒计数合并得到
+
+    Args:
+        base: per_second_counts 的返回值
+        width: 分箱宽度（秒）
+
+    Returns:
+        (edges, counts)：edges 为各分箱起始秒数（长度比 counts 多 1）
+    """
+    width = max(1, int(width))
+    starts = np.arange(0, base.size, width)
+    counts = np.add.reduceat(base, starts)
+    edges = np.append(starts, starts[-1] + width)
+    return edges, counts
+
+
+def comment_rate(base, window=30):
+    """
+    滑动窗口弹幕密度
+
+    Args:
+        base: per_second_counts 的返回值
+        window: 窗口长度（秒）
+
+    Returns:
+        每秒一个值的数组：以该秒为中心、长度为 window 的窗口内平均每分钟弹幕数
+    """
+    base = base.astype(np.float64)
+    window = max(1, min(int(window), base.size))
+    return np.convolve(base, np.ones(window), mode='same') * (60.0 / window)
+
+
+def find_peaks(rate, k=5, min_distance=30):
+    """
+    找出弹幕密度最高的 k 个时刻（高能时刻）
+
+    按密度从高到低依次选取，与已选时刻相距不足 min_distance 秒的跳过，
+    避免同一段高潮被重复选出。
+
+    Returns:
+        [(秒数, 每分钟弹幕数), ...]，按密度从高到低排列
+    """
+    peaks = []
+    for second in np.argsort(rate, kind='stable')[::-1]:
+        if rate[second] <= 0 or len(peaks) >= k:
+            break
+        if all(abs(int(second) - s) >= min_distance for s, _ in peaks):
+            peaks.append((int(second), float(rate[second])))
+    return peaks
+
+
+def plot_distribution(edges, counts, rate):
+    """
+    绘制时间分布直方图，并叠加弹幕密度曲线
+
+    Args:
+        edges, counts: histogram 的返回值
+        rate: comment_rate 的返回值
+
+    Returns:
+        matplotlib Figure
+    """
+    import matplotlib.pyplot as plt  # 只在绘图时加载
+
+    width = edges[1] - edges[0]
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.bar(edges[:-1], counts, width=width, align='edge', color='skyblue', edgecolor='black')
+    ax.set_xlabel('Video Time (seconds)', fontsize=12, fontname='Times New Roman')
+    ax.set_ylabel('Number of Comments', fontsize=12, fontname='Times New Roman')
+    ax.set_title(f'Time Distribution of Comments (bin width: {width}s)', fontsize=14, pad=15, fontname='Times New Roman')
+    ax.grid(True, linestyle='--', alpha=0.7)
+    # 叠加弹幕密度曲线（每分钟弹幕数）
+    ax_rate = ax.twinx()
+    ax_rate.plot(np.arange(rate.size), rate, color='#FF4B4B', linewidth=1)
+    ax_rate.set_ylabel('Comments per Minute', fontsize=12, fontname='Times New Roman')
+    fig.tight_layout()
+    return fig
+
+
+def cache_stats():
+    with _base_lock:
+        return {**_stats, 'entries': len(_base_counts)}
+
+
+def clear_cache():
+    with _base_lock:
+        _base_counts.clear()
+
+
+register_cache('时间分布', cache_stats, clear_cache)
@@ -0,0 +1,159 @@
+"""
+用户词典管理模块
+
+弹幕和领域语料中的网络用语、人名和中英混合术语，jieba 默认词典往往切分不好。
+用户词典保存在 USERDICT_DIR 目录中（jieba 格式，每行：词语 [词频] [词性]），
+apply() 把目录中的全部词典加载到分词器。
+
+词典版本是全部词典文件名和内容的哈希，segmentation 以上传词典的版本为键把合并后的
+前缀词典缓存到磁盘，词典不变时主进程和进程池中的进程直接读取缓存，不再逐条添加词语。
+页面上手动添加的词语（MANUAL_DICTIONARY）不进入缓存，在缓存之上逐条添加，
+因此添加词语时只需把新词加到当前分词器，不需要重建词典。
+"""
+import hashlib
+import os
+
+import jieba
+
+import segmentation
+import textio
+
+USERDICT_DIR = os.environ.get('USERDICT_DIR', './data/userdict')
+
+# 页面上手动添加的词语写入该词典
+MANUAL_DICTIONARY = 'manual.txt'
+
+def _path(name):
+    return os.path.join(USERDICT_DIR, name)
+
+
+def list_dictionaries():
+    """
+    列出全部用户词典
+
+    Returns:
+        [{'name': 文件名, 'words': 词语数, 'size': 字节数}, ...]，按文件名排序
+    """
+    if not os.path.isdir(USERDICT_DIR):
+        return []
+    result = []
+    for name in sorted(os.listdir(USERDICT_DIR)):
+        path = _path(name)
+        if not name.endswith('.txt') or not os.path.isfile(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            words = sum(1 for line in f if line.strip())
+        result.append({'name': name, 'words': words, 'size': os.path.getsize(path)})
+    return result
+
+
+def save_dictionary(name, data):
+    """
+    保存上传的用户词典（自动检测编码，统一转存为 UTF-8）
+
+    Args:
+        name: 文件名，已存在的同名词典会被覆盖
+        data: 词典文件的字节内容
+
+    Returns:
+        保存后的文件名
+    """
+    name = textio.safe_filename(name)
+    lines = [line.strip() for line in textio.decode_bytes(data).splitlines()]
+    os.makedirs(USERDICT_DIR, exist_ok=True)
+    with open(_path(name), 'w', encoding='utf-8') as f:
+        f.write(''.join(line + '\n' for line in lines if line))
+    return name
+
+
+def delete_dictionary(name):
+    """删除用户词典，返回是否删除了文件"""
+    path = _path(textio.safe_filename(name))
+    if os.path.isfile(path):
+        os.remove(path)
+        return True
+    return False
+
+
+def add_words(words, freq=None, tag=None):
+    """
+    把词语追加到手动添加的词典中
+
+    Args:
+        words: 词语列表
+        freq: 可选，词频
+        tag: 可选，词性
+
+    Returns:
+        实际添加的词语数（空白和已存在的词语不重复添加）
+    """
+    path = _path(MANUAL_DICTIONARY)
+    existing = set()
+    if os.path.isfile(path):
+        with open(path, encoding='utf-8') as f:
+            existing = {line.split()[0] for line in f if line.strip()}
+    suffix = ''.join(f' {value}' for value in (freq, tag) if value)
+    added = []
+    for word in words:
+        # jieba 词典以空白分隔字段，词语中不能包含空白
+        word = ''.join(word.split())
+        if word and word not in existing:
+            existing.add(word)
+            added.append(word + suffix + '\n')
+    if added:
+        os.makedirs(USERDICT_DIR, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.writelines(added)
+    return len(added)
+
+
+def _manual_words():
+    """手动添加的词语 [(词语, 词频, 词性), ...]，按 jieba 用户词典的格式解析"""
+    path = _path(MANUAL_DICTIONARY)
+    if not os.path.isfile(path):
+        return []
+    words = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                word, freq, tag = jieba.re_userdict.match(line).groups()
+                words.append((word, freq and freq.strip(), tag and tag.strip()))
+    return words
+
+
+def version(names=None):
+    """
+    用户词典的版本：文件名和内容的哈希，没有用户词典时为空字符串
+
+    Args:
+        names: 词典文件名列表，为 None 时使用全部词典
+    """
+    if names is None:
+        names = [item['name'] for item in list_dictionaries()]
+    if not names:
+        return ''
+    # jieba 版本不同时默认词典可能不同，缓存也不能共用
+    digest = hashlib.blake2b(jieba.__version__.encode('utf-8'), digest_size=8)
+    for name in sorted(names):
+        digest.update(name.encode('utf-8') + b'\0')
+        with open(_path(name), 'rb') as f:
+            digest.update(f.read())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def apply():
+    """
+    把全部用户词典加载到分词器（词典未变化时不做任何事）
+
+    上传的词典合并后缓存到磁盘；只是手动添加了词语时，新词直接添加到当前分词器。
+
+    Returns:
+        分词器的词典是否发生了变化
+    """
+    names = [item['name'] for item in list_dictionaries()]
+    files = [name for name in names if name != MANUAL_DICTIONARY]
+    return segmentation.load_dictionaries(
+        [_path(name) for name in files], version(names), version(files), _manual_words()
+    )
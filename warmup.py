@@ -0,0 +1,100 @@
+"""
+启动预热模块
+
+jieba 词典（含用户词典）、SnowNLP 情感模型、词云字体和 matplotlib 都在第一次使用时才加载，
+首次分析会因此多等几秒。start() 在后台线程中依次加载这些资源，
+页面照常渲染，用户开始分析时通常已经加载完成。
+
+每一步的耗时和每次页面运行的耗时都会被记录，可在页面上查看冷启动和首次请求的延迟。
+"""
+import threading
+import time
+
+# 模块首次导入的时间，近似为服务启动后第一次运行页面脚本的时间
+PROCESS_START = time.perf_counter()
+
+_thread = None
+_lock = threading.Lock()
+_done = threading.Event()
+# {步骤名称: 耗时（秒）或错误信息}
+_timings = {}
+# 页面运行耗时：第一次和最近一次
+_runs = {'first': None, 'last': None, 'count': 0}
+
+
+def _load_jieba():
+    import segmentation
+    import userdict
+    # 先加载用户词典（读取磁盘缓存），没有用户词典时再加载默认词典
+    userdict.apply()
+    segmentation.initialize()
+
+
+def _load_snownlp():
+    import sentiment
+    sentiment.load_snownlp()
+
+
+def _load_fonts():
+    import wordcloud_render
+    wordcloud_render.preload_font()
+
+
+def _load_matplotlib():
+    import matplotlib.pyplot  # noqa: F401
+
+
+# 预热步骤，按用户最可能先用到的顺序排列
+STEPS = [
+    ('jieba 词典', _load_jieba),
+    ('SnowNLP 情感模型', _load_snownlp),
+    ('词云字体', _load_fonts),
+    ('matplotlib', _load_matplotlib),
+]
+
+
+def _run():
+    try:
+        for name, load in STEPS:
+            start = time.perf_counter()
+            try:
+                load()
+                _timings[name] = time.perf_counter() - start
+            except Exception as e:
+                # 预热失败不影响页面，第一次实际使用时会再次加载并报告错误
+                _timings[name] = f'{type(e).__name__}: {e}'
+    finally:
+        _timings['总计（自启动）'] = time.perf_counter() - PROCESS_START
+        _done.set()
+
+
+def start():
+    """在后台线程中开始预热（每个进程只执行一次，可重复调用）"""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name='warmup', daemon=True)
+            _thread.start()
+
+
+def wait(timeout=None):
+    """等待预热完成，返回是否已完成"""
+    return _done.wait(timeout)
+
+
+def record_run(seconds):
+    """记录一次页面运行的耗时"""
+    with _lock:
+        if _runs['first'] is None:
+            _runs['first'] = seconds
+        _runs['last'] = seconds
+        _runs['count'] += 1
+
+
+def status():
+    """
+    Returns:
+        {'done': 是否完成, 'steps': {步骤名称: 耗时或错误信息}, 'runs': {'first', 'last', 'count'}}
+    """
+    with _lock:
+        return {'done': _done.is_set(), 'steps': dict(_timings), 'runs': dict(_runs)}
@@ -0,0 +1,110 @@
+"""
+词云图渲染模块
+
+- 渲染结果（PIL 图像）按 词频表哈希 + 渲染参数 缓存，相同输入直接返回；
+- 字体文件只读取一次：WordCloud 布局时会为每个字号调用 ImageFont.truetype，
+  这里传入的是已读入内存的字体（文件对象），不再为每个字号重新读取字体文件；
+- 直接输出 WordCloud.to_image() 的 PIL 图像，不经过 matplotlib。
+"""
+import functools
+import hashlib
+import os
+import threading
+
+from wordcloud import WordCloud
+
+from caching import TTLCache, register_cache
+
+FONT_PATH = './static/Hiragino Sans GB.ttc'  # 使用支持中英文的字体
+
+# 同时保留在内存中的字体文件数
+FONT_CACHE_SIZE = 4
+
+_image_cache = TTLCache(maxsize=16, ttl=3600)
+# 渲染过程串行进行，避免多个会话同时布局时占用过多内存
+_render_lock = threading.Lock()
+
+
+class _PreloadedFont:
+    """
+    已读入内存的字体文件
+
+    作为 font_path 传给 WordCloud：PIL 从文件对象加载字体时调用 read()，
+    每次都返回同一份字节，不再访问磁盘。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._data = f.read()
+
+    def read(self, size=-1):
+        return self._data
+
+
+@functools.lru_cache(maxsize=FONT_CACHE_SIZE)
+def _load_font(font_path):
+    return _PreloadedFont(font_path)
+
+
+def preload_font(font_path=FONT_PATH):
+    """预先读取字体文件（启动预热用），字体文件不存在时返回 False"""
+    if not os.path.exists(font_path):
+        return False
+    _load_font(font_path)
+    return True
+
+
+def frequencies_key(frequencies, **params):
+    """由词频表和渲染参数计算缓存键"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(sorted(frequencies.items())).encode('utf-8'))
+    digest.update(repr(sorted(params.items())).encode('utf-8'))
+    return digest.digest()
+
+
+def render(frequencies, width=1200, height=800, background_color='white',
+           max_words=200, font_path=FONT_PATH, random_state=42, cache=True):
+    """
+    根据词频表渲染词云图
+
+    Args:
+        frequencies: {词语: 频次}
+        cache: 是否使用渲染结果缓存（批量处理时每份词频只渲染一次，不需要缓存）
+        其余参数与 WordCloud 相同
+
+    Returns:
+        PIL.Image 图像（缓存共享的对象，调用方不应原地修改）
+    """
+    params = dict(
+        width=width,
+        height=height,
+        background_color=background_color,
+        max_words=max_words,
+        font_path=font_path,
+        random_state=random_state,
+    )
+
+    def compute():
+        with _render_lock:
+            cloud = WordCloud(**dict(params, font_path=_load_font(font_path)))
+            return cloud.generate_from_frequencies(frequencies).to_image()
+
+    if not cache:
+        return compute()
+    return _image_cache.get_or_compute(frequencies_key(frequencies, **params), compute)
+
+
+def cache_stats():
+    fonts = _load_font.cache_info()
+    return {
+        'images': _image_cache.stats(),
+        'fonts': {'hits': fonts.hits, 'misses': fonts.misses, 'entries': fonts.currsize},
+    }
+
+
+def clear_cache():
+    _image_cache.clear()
+
+
+register_cache('词云图', cache_stats, clear_cache)